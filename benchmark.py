@@ -0,0 +1,343 @@
+"""Бенчмарк горячих путей редактора и просмотрщика.
+
+Запускается без экрана (QT_QPA_PLATFORM=offscreen) на синтетических колодах:
+
+    python benchmark.py --sizes 100,1000,10000 --resolution 3840x2160 --output results.json
+    python benchmark.py --baseline results.json
+
+Каждый размер колоды прогоняется в отдельном процессе, чтобы пиковый RSS относился
+только к нему. Для каждой операции печатаются перцентили задержки, а также пиковый RSS
+и объем декодированных слайдов. С --baseline результаты сравниваются с сохраненными, и при
+замедлении сильнее допуска скрипт завершается с кодом 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # В Windows модуля нет, пиковую память спрашиваем у psutil
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QColor, QPainter, QLinearGradient
+from PyQt5.QtCore import QSize
+
+import main as app
+
+# Разница меньше этой считается шумом и не проваливает сравнение
+NOISE_FLOOR_MS = 0.5
+
+
+class DecodeCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        self.read_slide_image = app.read_slide_image
+        self.decode_thumbnail = app.ThumbnailStore.decode_thumbnail
+
+    def add(self, image):
+        with self.lock:
+            self.total_bytes += image.sizeInBytes()
+        return image
+
+    def install(self):
+        # Считаем и просмотрщик, и миниатюры редактора
+        def counted(path, target_size=None, bounded=True):
+            return self.add(self.read_slide_image(path, target_size, bounded))
+
+        def counted_thumbnail(path):
+            return self.add(self.decode_thumbnail(path))
+
+        app.read_slide_image = counted
+        app.ThumbnailStore.decode_thumbnail = staticmethod(counted_thumbnail)
+
+    def take(self):
+        with self.lock:
+            total, self.total_bytes = self.total_bytes, 0
+        return total
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return QSize(int(width), int(height))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    position = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.5), 3),
+        "p90_ms": round(percentile(samples, 0.9), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def timed(samples, action):
+    started = time.perf_counter()
+    action()
+    samples.append((time.perf_counter() - started) * 1000)
+
+
+def peak_rss_bytes():
+    if resource is not None:
+        # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss)
+    # Без psutil в Windows память не меряем
+    return None
+
+
+def make_sources(directory, resolution, unique):
+    sources = []
+    for i in range(unique):
+        image = QImage(resolution, QImage.Format_RGB32)
+        painter = QPainter(image)
+        gradient = QLinearGradient(0, 0, resolution.width(), resolution.height())
+        gradient.setColorAt(0, QColor.fromHsv(i * 37 % 360, 200, 220))
+        gradient.setColorAt(1, QColor.fromHsv(i * 91 % 360, 255, 90))
+        painter.fillRect(image.rect(), gradient)
+        painter.end()
+        path = os.path.join(directory, f"source_{i}.jpg")
+        image.save(path, "JPG", 90)
+        sources.append(path)
+    return sources
+
+
+def make_deck(directory, sources, size):
+    # Пути должны быть разными, иначе кэши просмотрщика подменят декодирование
+    images = []
+    for i in range(size):
+        path = os.path.join(directory, f"slide_{i:05d}.jpg")
+        try:
+            os.link(sources[i % len(sources)], path)
+        except OSError:
+            shutil.copyfile(sources[i % len(sources)], path)
+        images.append(path)
+    return {"images": images, "codes": {}}
+
+
+def wait(application, seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        application.processEvents()
+        time.sleep(0.001)
+
+
+def run_deck(application, window, config, args, counter):
+    editor = window.editor
+    operations = {}
+    counter.take()
+    saved_before = app.DecodeStats.stats()["saved_bytes"]
+
+    # Повторная загрузка той же колоды - пустое сравнение, поэтому перед каждым замером колода очищается
+    samples = operations.setdefault("set_config", [])
+    empty = {"images": [], "codes": {}}
+    for _ in range(args.repeat):
+        editor.set_config(empty)
+        application.processEvents()
+        timed(samples, lambda: editor.set_config(config))
+        application.processEvents()
+
+    # Строки рисует делегат, поэтому меряем полную перерисовку видимой области списка
+    samples = operations.setdefault("editor_scroll", [])
+    bar = editor.list_images.verticalScrollBar()
+    for step in range(args.repeat):
+        bar.setValue(bar.maximum() * step // max(1, args.repeat - 1))
+        timed(samples, lambda: editor.list_images.viewport().repaint())
+
+    middle = len(config["images"]) // 2
+    editor.select_row(middle)
+    up, down = operations.setdefault("move_up", []), operations.setdefault("move_down", [])
+    for _ in range(args.repeat):
+        timed(down, editor.move_down)
+        timed(up, editor.move_up)
+    editor.set_config(config)
+    application.processEvents()
+
+    window.start_slideshow()
+    viewer = window.viewer
+    wait(application, 0.2)
+    samples = operations.setdefault("show_image", [])
+    for i in range(min(args.transitions, len(config["images"]))):
+        viewer.current_index = i
+        timed(samples, viewer.show_image)
+        # Пауза между слайдами дает префетчеру время, как у живого зрителя
+        wait(application, args.dwell_ms / 1000)
+
+    samples = operations.setdefault("repaint", [])
+    for _ in range(args.repeat):
+        timed(samples, viewer.canvas.repaint)
+
+    samples = operations.setdefault("resize", [])
+    window.showNormal()
+    for i in range(args.repeat):
+        width = 1000 + (i % 2) * 280
+        timed(samples, lambda: (window.resize(width, 700), application.processEvents()))
+    viewer.close_slideshow()
+    wait(application, 0.1)
+
+    return {
+        "operations": {name: summarize(values) for name, values in operations.items() if values},
+        "decoded_bytes": counter.take(),
+        "decode_saved_bytes": app.DecodeStats.stats()["saved_bytes"] - saved_before,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for size, deck in results["decks"].items():
+        base_deck = baseline.get("decks", {}).get(size)
+        if base_deck is None:
+            continue
+        for name, stats in deck["operations"].items():
+            base = base_deck["operations"].get(name)
+            if base is None:
+                continue
+            for metric in ("p50_ms", "p90_ms"):
+                limit = base[metric] * (1 + tolerance)
+                if stats[metric] > limit and stats[metric] - base[metric] > NOISE_FLOOR_MS:
+                    failures.append(f"{size}/{name} {metric}: {stats[metric]:.2f} > {base[metric]:.2f}")
+        if deck["peak_rss_bytes"] is None or base_deck["peak_rss_bytes"] is None:
+            continue
+        if deck["peak_rss_bytes"] > base_deck["peak_rss_bytes"] * (1 + tolerance):
+            failures.append(
+                f"{size} peak_rss: {deck['peak_rss_bytes'] >> 20} МБ > {base_deck['peak_rss_bytes'] >> 20} МБ"
+            )
+    return failures
+
+
+def print_results(results):
+    for size, deck in results["decks"].items():
+        peak = deck["peak_rss_bytes"]
+        print(f"\n{size} слайдов: декодировано {deck['decoded_bytes'] >> 20} МБ "
+              f"(сэкономлено {deck.get('decode_saved_bytes', 0) >> 20} МБ), "
+              f"пиковый RSS {f'{peak >> 20} МБ' if peak is not None else 'не измерен'}")
+        for name, stats in deck["operations"].items():
+            print(f"  {name:<14} p50 {stats['p50_ms']:9.2f} мс  p90 {stats['p90_ms']:9.2f} мс  "
+                  f"p99 {stats['p99_ms']:9.2f} мс  max {stats['max_ms']:9.2f} мс  (n={stats['count']})")
+
+
+def run_size(args):
+    # Выполняется в дочернем процессе: одна колода на процесс
+    resolution = parse_resolution(args.resolution)
+    application = QApplication(sys.argv)
+    counter = DecodeCounter()
+    counter.install()
+
+    workdir = tempfile.mkdtemp(prefix="slideshow-bench-")
+    cwd = os.getcwd()
+    try:
+        # Колода и кэш миниатюр создаются относительно текущего каталога
+        os.chdir(workdir)
+        sources = make_sources(workdir, resolution, args.unique)
+        window = app.MainWindow()
+        window.show()
+        wait(application, 0.3)
+
+        deck_dir = os.path.join(workdir, "deck")
+        os.makedirs(deck_dir)
+        config = make_deck(deck_dir, sources, args.deck_size)
+        result = run_deck(application, window, config, args, counter)
+        window.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    return 0
+
+
+def spawn_size(args, size):
+    # ru_maxrss - максимум за всю жизнь процесса, поэтому каждая колода меряется в своем
+    fd, result_path = tempfile.mkstemp(prefix="slideshow-bench-", suffix=".json")
+    os.close(fd)
+    try:
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--resolution", args.resolution,
+            "--unique", str(args.unique),
+            "--repeat", str(args.repeat),
+            "--transitions", str(args.transitions),
+            "--dwell-ms", str(args.dwell_ms),
+            "--deck-size", str(size),
+            "--result", result_path,
+        ]
+        subprocess.run(command, check=True)
+        with open(result_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк редактора и просмотрщика слайдов")
+    parser.add_argument("--sizes", default="100,1000", help="размеры колод через запятую")
+    parser.add_argument("--resolution", default="1920x1080", help="разрешение исходных изображений")
+    parser.add_argument("--unique", type=int, default=20, help="сколько разных исходников сгенерировать")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов для операций редактора")
+    parser.add_argument("--transitions", type=int, default=30, help="сколько слайдов показать")
+    parser.add_argument("--dwell-ms", type=int, default=50, help="пауза между слайдами")
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON с прошлым прогоном для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое замедление (0.25 = 25%%)")
+    # Служебные: прогон одной колоды в дочернем процессе
+    parser.add_argument("--deck-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.deck_size is not None:
+        return run_size(args)
+
+    results = {
+        "resolution": args.resolution,
+        "platform": sys.platform,
+        "decks": {},
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        results["decks"][str(size)] = spawn_size(args, size)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance)
+        if failures:
+            print("\nРегрессии производительности:", file=sys.stderr)
+            for failure in failures:
+                print(f"  {failure}", file=sys.stderr)
+            return 1
+        print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
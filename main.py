@@ -1,12 +1,653 @@
 import sys
 import os
+import argparse
 import json
+import hashlib
+import mmap
+import multiprocessing
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.request import pathname2url
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QPushButton, QLineEdit, QListWidget, QFileDialog,
-                             QTabWidget, QSizePolicy,
-                             QFrame, QListWidgetItem, QDialog, QGraphicsDropShadowEffect)
-from PyQt5.QtGui import QPixmap, QFont, QPalette, QColor, QLinearGradient, QBrush
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QRect, QPoint, QPointF
+                             QLabel, QPushButton, QLineEdit, QListView, QFileDialog, QInputDialog,
+                             QAbstractItemView,
+                             QTabWidget, QSizePolicy, QStyle, QStyledItemDelegate, QProgressBar,
+                             QFrame, QDialog, QGraphicsDropShadowEffect, QGraphicsOpacityEffect,
+                             QProgressDialog)
+from PyQt5.QtGui import (QPixmap, QImage, QImageReader, QFont, QPalette, QColor, QLinearGradient, QBrush,
+                         QPen, QFontMetrics, QPainter)
+from PyQt5.QtCore import (Qt, QTimer, QPropertyAnimation, QEasingCurve, QRect, QPoint, QPointF,
+                          QObject, QRunnable, QThreadPool, pyqtSignal, QAbstractListModel,
+                          QModelIndex, QSize, QMimeData, QBuffer, QIODevice,
+                          QFileSystemWatcher)
+
+
+# Настройки по умолчанию (переопределяются секцией "settings" в config.json)
+DEFAULT_SETTINGS = {
+    "prefetch_ahead": 3,
+    "prefetch_behind": 1,
+    "decode_workers": 2,
+    "display_cache_mb": 512,
+    "rescale_delay_ms": 150,
+    "thumbnail_cache_dir": ".thumbnails",
+    "thumbnail_cache_mb": 200,
+    "import_workers": 4,
+    "thumbnail_workers": 2,
+    "rendition_heights": [2160, 1440, 1080, 720],
+    "render_workers": 4,
+    "transition": "crossfade",
+    "transition_ms": 250,
+    "watch_files": False,
+    "preflight": False,
+    "preflight_slides": 3,
+    "bounded_decode": True,
+}
+
+THUMBNAIL_SIZE = 60
+
+DECK_FILE = "deck.db"
+LEGACY_CONFIG_FILE = "config.json"
+PACKAGE_EXTENSION = ".ssdeck"
+# Слайд из пакета адресуется как "<путь к пакету>|<номер слайда>"
+PACKAGE_SEPARATOR = "|"
+
+
+def load_settings(config):
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(config.get("settings", {}))
+    return settings
+
+
+class DeckPackage:
+    MAGIC = b"SSDECK01"
+    TRAILER = struct.Struct("<Q8s")
+    ALIGNMENT = 64
+    VERSION = 3
+
+    registry = {}
+    registry_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        # Оглавление лежит в конце файла, за ним смещение оглавления и сигнатура
+        if len(self.map) < len(self.MAGIC) + self.TRAILER.size or self.map[:len(self.MAGIC)] != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} не является пакетом колоды")
+        index_offset, magic = self.TRAILER.unpack_from(self.map, len(self.map) - self.TRAILER.size)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} поврежден")
+        index = json.loads(bytes(self.view[index_offset:len(self.map) - self.TRAILER.size]).decode())
+        version = index.get("version")
+        if version not in (1, 2, self.VERSION):
+            self.close()
+            raise ValueError(f"{path}: неподдерживаемая версия пакета {version}")
+        self.slides = index["slides"]
+        if version == 1:
+            # В первой версии у слайда была одна копия под экран вместо набора
+            for slide in self.slides:
+                rendition = slide.pop("rendition", None)
+                slide["renditions"] = [rendition] if rendition is not None else []
+
+    @classmethod
+    def open(cls, path):
+        path = os.path.abspath(path)
+        with cls.registry_lock:
+            package = cls.registry.get(path)
+            if package is None:
+                package = cls.registry[path] = cls(path)
+            return package
+
+    @classmethod
+    def evict(cls, path):
+        with cls.registry_lock:
+            package = cls.registry.pop(os.path.abspath(path), None)
+        if package is not None:
+            package.close()
+
+    @classmethod
+    def close_all(cls):
+        with cls.registry_lock:
+            packages = list(cls.registry.values())
+            cls.registry.clear()
+        for package in packages:
+            package.close()
+
+    @staticmethod
+    def split_ref(ref):
+        path, separator, number = ref.rpartition(PACKAGE_SEPARATOR)
+        if separator and path.endswith(PACKAGE_EXTENSION) and number.isdigit():
+            return path, int(number)
+        return None
+
+    def slide_ref(self, number):
+        return f"{self.path}{PACKAGE_SEPARATOR}{number}"
+
+    def deck(self):
+        images = [self.slide_ref(i) for i in range(len(self.slides))]
+        codes = {ref: slide["code"] for ref, slide in zip(images, self.slides)}
+        return {"images": images, "codes": codes}
+
+    def blob(self, entry):
+        offset, length = entry["offset"], entry["length"]
+        return self.view[offset:offset + length]
+
+    def raw_image(self, entry):
+        # QImage смотрит прямо в отображенную память: ни открытия файла, ни декодирования
+        if entry is None:
+            return QImage()
+        return QImage(self.blob(entry), entry["width"], entry["height"], entry["stride"], entry["format"])
+
+    def original_bytes(self, number):
+        return bytes(self.blob(self.slides[number]["original"]))
+
+    def image(self, number, target_size=None):
+        # Берем самую маленькую копию, которая все еще покрывает целевой размер
+        renditions = self.slides[number]["renditions"]
+        if not renditions:
+            return QImage.fromData(self.original_bytes(number))
+        chosen = renditions[-1]
+        if target_size is not None:
+            for entry in renditions:
+                if entry["width"] >= target_size.width() or entry["height"] >= target_size.height():
+                    chosen = entry
+                    break
+        return self.raw_image(chosen)
+
+    def thumbnail(self, number):
+        # Миниатюры подолгу живут в кэшах редактора: копия в несколько килобайт не держит
+        # отображение открытым, и пакет можно закрыть или перезаписать
+        return self.raw_image(self.slides[number].get("thumbnail")).copy()
+
+    def close(self):
+        try:
+            self.view.release()
+            self.map.close()
+        except (BufferError, ValueError):
+            # На память пакета еще ссылаются изображения - отображение закроется вместе с ними
+            pass
+        self.file.close()
+
+    @classmethod
+    def write(cls, path, images, codes, rendition_heights, workers=4, progress=None):
+        tmp_path = path + ".tmp"
+        slides = []
+        # spawn, а не fork: дочерний процесс не должен наследовать состояние Qt
+        executor = ProcessPoolExecutor(max(1, workers), multiprocessing.get_context("spawn"))
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(cls.MAGIC)
+
+                # В работе держим не больше двух слайдов на процесс, чтобы не копить пиксели в памяти
+                queue = deque()
+                submitted = 0
+                while submitted < len(images) or queue:
+                    while submitted < len(images) and len(queue) < workers * 2:
+                        queue.append(executor.submit(render_slide, images[submitted], rendition_heights))
+                        submitted += 1
+
+                    while True:
+                        try:
+                            renditions, thumbnail, animated = queue[0].result(timeout=0.1)
+                            break
+                        except FutureTimeoutError:
+                            if progress is not None and not progress(len(slides)):
+                                raise InterruptedError()
+                    queue.popleft()
+
+                    image_path = images[len(slides)]
+                    slides.append({
+                        "name": slide_name(image_path),
+                        "code": codes.get(image_path, ""),
+                        "original": cls.write_blob(f, read_slide_bytes(image_path)),
+                        "renditions": [cls.write_raw_image(f, *rendition) for rendition in renditions],
+                        "thumbnail": cls.write_raw_image(f, *thumbnail) if thumbnail else None,
+                        "animated": animated,
+                    })
+                    if progress is not None and not progress(len(slides)):
+                        raise InterruptedError()
+
+                index_offset = f.tell()
+                f.write(json.dumps({"version": cls.VERSION, "slides": slides}).encode())
+                f.write(cls.TRAILER.pack(index_offset, cls.MAGIC))
+            # Открытый пакет с тем же именем закрываем до замены: в Windows файл,
+            # отображенный в память, заменить нельзя
+            cls.evict(path)
+            os.replace(tmp_path, path)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def write_blob(cls, f, data):
+        # Выравниваем начало блока, чтобы строки пикселей лежали по границе
+        padding = -f.tell() % cls.ALIGNMENT
+        f.write(b"\0" * padding)
+        offset = f.tell()
+        f.write(data)
+        return {"offset": offset, "length": len(data)}
+
+    @classmethod
+    def write_raw_image(cls, f, width, height, stride, image_format, data):
+        entry = cls.write_blob(f, data)
+        entry.update(width=width, height=height, stride=stride, format=image_format)
+        return entry
+
+
+def raw_image_data(image):
+    image_format = QImage.Format_ARGB32_Premultiplied if image.hasAlphaChannel() else QImage.Format_RGB32
+    image = image.convertToFormat(image_format)
+    return (image.width(), image.height(), image.bytesPerLine(), int(image_format),
+            image.constBits().asstring(image.sizeInBytes()))
+
+
+def render_slide(path, rendition_heights):
+    # Выполняется в отдельном процессе при упаковке: декодирует исходник один раз
+    # и строит из него пирамиду копий от большей к меньшей
+    try:
+        data = read_slide_bytes(path)
+    except (OSError, ValueError, IndexError):
+        data = b""
+    image = QImage.fromData(data)
+    if image.isNull():
+        return [], None, False
+
+    renditions = []
+    source = image
+    for height in sorted(rendition_heights, reverse=True):
+        box = QSize(height * 16 // 9, height)
+        if source.width() > box.width() or source.height() > box.height():
+            source = source.scaled(box, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if not renditions or renditions[-1][:2] != (source.width(), source.height()):
+            renditions.append(raw_image_data(source))
+    renditions.reverse()
+
+    thumbnail = source.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return renditions, raw_image_data(thumbnail), is_animated_data(data)
+
+
+def is_animated_data(data):
+    buffer = QBuffer()
+    buffer.setData(data)
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    # Для GIF imageCount() просматривает весь файл, поэтому зовется только вне GUI-потока
+    return reader.supportsAnimation() and reader.imageCount() != 1
+
+
+def slide_animated(path):
+    # Выполняется в потоке декодирования. У пакета признак записан в оглавлении при упаковке
+    ref = DeckPackage.split_ref(path)
+    try:
+        if ref is not None:
+            animated = DeckPackage.open(ref[0]).slides[ref[1]].get("animated")
+            if animated is not None:
+                return animated
+        reader = open_slide_reader(path)
+        return reader.supportsAnimation() and reader.imageCount() != 1
+    except (OSError, ValueError, IndexError):
+        return False
+
+
+def read_slide_image(path, target_size=None, bounded=True):
+    ref = DeckPackage.split_ref(path)
+    if ref is not None:
+        with TransitionTracer.span("read", path=path, source="package"):
+            try:
+                return DeckPackage.open(ref[0]).image(ref[1], target_size)
+            except (OSError, ValueError, IndexError):
+                return QImage()
+
+    # Чтение и декодирование разделены, чтобы в трассировке было видно, что из них медленнее
+    with TransitionTracer.span("read", path=path, source="file") as args:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return QImage()
+        if args is not None:
+            args["bytes"] = len(data)
+    with TransitionTracer.span("decode", path=path) as args:
+        if target_size is None or not bounded:
+            return QImage.fromData(data)
+
+        # Панораму 12000x9000 незачем распаковывать целиком ради экрана 1920x1080:
+        # JPEG-плагин уменьшает прямо при распаковке, остальные форматы - сразу после нее
+        buffer = QBuffer()
+        buffer.setData(data)
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        source_size = reader.size()
+        if source_size.isValid() and (source_size.width() > target_size.width() or
+                                      source_size.height() > target_size.height()):
+            reader.setScaledSize(source_size.scaled(target_size, Qt.KeepAspectRatio))
+        image = reader.read()
+        if not image.isNull() and source_size.isValid():
+            saved = DecodeStats.record(path, source_size, image)
+            if args is not None:
+                args["bytes_saved"] = saved
+        return image
+
+
+def open_slide_reader(path):
+    ref = DeckPackage.split_ref(path)
+    if ref is None:
+        return QImageReader(path)
+    buffer = QBuffer()
+    buffer.setData(DeckPackage.open(ref[0]).original_bytes(ref[1]))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    # Устройство должно жить, пока жив читатель
+    reader.buffer = buffer
+    return reader
+
+
+def read_slide_bytes(path):
+    ref = DeckPackage.split_ref(path)
+    if ref is not None:
+        return DeckPackage.open(ref[0]).original_bytes(ref[1])
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def slide_name(path):
+    ref = DeckPackage.split_ref(path)
+    if ref is not None:
+        try:
+            return DeckPackage.open(ref[0]).slides[ref[1]]["name"]
+        except (OSError, ValueError, IndexError):
+            pass
+    return os.path.basename(path)
+
+
+def slide_exists(path):
+    ref = DeckPackage.split_ref(path)
+    if ref is not None:
+        path = ref[0]
+    return os.path.isfile(path)
+
+
+def slide_mtime(path):
+    ref = DeckPackage.split_ref(path)
+    try:
+        return os.path.getmtime(ref[0] if ref is not None else path)
+    except OSError:
+        return None
+
+
+class DeckStorage:
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path, read_only=False):
+        self.path = path
+        if read_only:
+            # Только чтение: ни создания файла, ни миграции, ни переключения журнала. Без -wal
+            # все данные уже в самом файле, и immutable не дает SQLite заводить -wal и -shm
+            mode = "ro" if os.path.exists(path + "-wal") else "ro&immutable=1"
+            self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode={mode}", uri=True)
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                self.conn.close()
+                raise ValueError(f"Колода {path} имеет неподдерживаемую версию {version}")
+        else:
+            self.conn = sqlite3.connect(path)
+            # WAL: каждое сохранение - атомарная транзакция, сбой не портит колоду
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.migrate()
+
+        # Последнее сохраненное состояние: с ним сравнивается новое при сохранении
+        self.path_ids = dict(self.conn.execute("SELECT path, id FROM paths"))
+        self.images, self.codes = self.read_deck()
+
+    def migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > self.SCHEMA_VERSION:
+            raise RuntimeError(f"Колода {self.path} создана более новой версией программы")
+        if version == self.SCHEMA_VERSION:
+            return
+
+        # Путь к файлу хранится один раз, слайды ссылаются на него по id
+        self.conn.executescript(f"""
+            BEGIN;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS paths (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                code TEXT
+            );
+            CREATE TABLE IF NOT EXISTS slides (
+                position INTEGER PRIMARY KEY,
+                path_id INTEGER NOT NULL REFERENCES paths(id)
+            );
+            PRAGMA user_version = {self.SCHEMA_VERSION};
+            COMMIT;
+        """)
+
+    def read_deck(self):
+        images = [row[0] for row in self.conn.execute(
+            "SELECT paths.path FROM slides JOIN paths ON paths.id = slides.path_id ORDER BY slides.position"
+        )]
+        codes = dict(self.conn.execute("SELECT path, code FROM paths WHERE code IS NOT NULL"))
+        return images, codes
+
+    def read_settings(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def load_config(self):
+        return {"images": list(self.images), "codes": dict(self.codes), "settings": self.read_settings()}
+
+    def needs_import(self):
+        # Старый config.json переносится один раз и только в пустую колоду: если прошлый перенос
+        # сорвался, отметки нет и он повторится при следующем запуске
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'imported'").fetchone()
+        return row is None and not self.images and not self.read_settings()
+
+    def import_config(self, json_path):
+        with open(json_path, "r") as f:
+            config = json.load(f)
+        self.save_deck(config.get("images", []), config.get("codes", {}), config.get("settings"),
+                       imported=json_path)
+
+    def ensure_paths(self, paths):
+        new_paths = [path for path in dict.fromkeys(paths) if path not in self.path_ids]
+        if not new_paths:
+            return
+        self.conn.executemany("INSERT OR IGNORE INTO paths (path) VALUES (?)", [(path,) for path in new_paths])
+        for path in new_paths:
+            self.path_ids[path] = self.conn.execute("SELECT id FROM paths WHERE path = ?", (path,)).fetchone()[0]
+
+    def set_code(self, path, code):
+        # Точечное обновление одного слайда
+        with self.conn:
+            self.ensure_paths([path])
+            self.conn.execute("UPDATE paths SET code = ? WHERE id = ?", (code, self.path_ids[path]))
+        self.codes[path] = code
+
+    def save_deck(self, images, codes, settings=None, imported=None):
+        # Пишем только отличия от последнего сохранения, все в одной транзакции
+        old_images = self.images
+        try:
+            with self.conn:
+                self.ensure_paths(list(images) + list(codes))
+
+                changed_codes = [(code, self.path_ids[path]) for path, code in codes.items()
+                                 if self.codes.get(path) != code]
+                changed_codes += [(None, self.path_ids[path]) for path in self.codes if path not in codes]
+                self.conn.executemany("UPDATE paths SET code = ? WHERE id = ?", changed_codes)
+
+                common = min(len(old_images), len(images))
+                self.conn.executemany(
+                    "UPDATE slides SET path_id = ? WHERE position = ?",
+                    [(self.path_ids[images[i]], i) for i in range(common) if images[i] != old_images[i]]
+                )
+                self.conn.executemany(
+                    "INSERT INTO slides (position, path_id) VALUES (?, ?)",
+                    [(i, self.path_ids[images[i]]) for i in range(common, len(images))]
+                )
+                if len(images) < len(old_images):
+                    self.conn.execute("DELETE FROM slides WHERE position >= ?", (len(images),))
+
+                if len(images) < len(old_images) or set(old_images) - set(images):
+                    self.conn.execute(
+                        "DELETE FROM paths WHERE code IS NULL AND id NOT IN (SELECT path_id FROM slides)"
+                    )
+                    self.path_ids = dict(self.conn.execute("SELECT path, id FROM paths"))
+
+                if settings is not None:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('settings', ?)",
+                        (json.dumps(settings),)
+                    )
+                if imported is not None:
+                    self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('imported', ?)", (imported,))
+        except Exception:
+            # Транзакция откатилась: кэш идентификаторов мог устареть
+            self.path_ids = dict(self.conn.execute("SELECT path, id FROM paths"))
+            raise
+
+        self.images = list(images)
+        self.codes = dict(codes)
+
+    def close(self):
+        self.conn.close()
+
+
+class StartupProfiler:
+    LABELS = {
+        "app_created": "приложение создано",
+        "window_created": "окно создано",
+        "first_paint": "первая отрисовка",
+        "interactive": "готово к работе",
+    }
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.started
+
+    def report(self):
+        return " • ".join(
+            f"{self.LABELS.get(name, name)}: {seconds * 1000:.0f} мс"
+            for name, seconds in self.marks.items()
+        )
+
+
+class TransitionTracer:
+    # Кольцевой буфер событий в формате Chrome trace: старые события вытесняются,
+    # поэтому трассировку можно держать включенной на киоске постоянно
+    enabled = False
+    output_path = "slideshow-trace.json"
+    events = deque(maxlen=50000)
+    started = time.perf_counter()
+
+    @classmethod
+    def configure(cls, argv):
+        for arg in argv:
+            if arg == "--trace" or arg.startswith("--trace="):
+                cls.enabled = True
+                cls.output_path = arg.partition("=")[2] or cls.output_path
+
+    @classmethod
+    def now_us(cls):
+        return (time.perf_counter() - cls.started) * 1000000
+
+    @classmethod
+    def span(cls, name, **args):
+        if not cls.enabled:
+            return nullcontext()
+        return cls.record(name, args)
+
+    @classmethod
+    @contextmanager
+    def record(cls, name, args):
+        start = cls.now_us()
+        try:
+            yield args
+        finally:
+            cls.add(name, start, cls.now_us() - start, args)
+
+    @classmethod
+    def add(cls, name, start_us, duration_us, args=None):
+        # deque.append атомарен, так что писать можно и из потоков декодирования
+        cls.events.append({
+            "name": name,
+            "cat": "transition",
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(duration_us, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+
+    @classmethod
+    def export(cls, path=None):
+        if not cls.enabled:
+            return
+        path = path or cls.output_path
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": list(cls.events), "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class DecodeStats:
+    # Сколько памяти сэкономило декодирование под размер экрана, по каждому слайду
+    SLIDE_ENTRIES = 4096
+    lock = threading.Lock()
+    slides = OrderedDict()
+    decoded_bytes = 0
+    saved_bytes = 0
+
+    @classmethod
+    def record(cls, path, source_size, image):
+        full_bytes = source_size.width() * source_size.height() * image.depth() // 8
+        saved = max(0, full_bytes - image.sizeInBytes())
+        with cls.lock:
+            cls.slides.pop(path, None)
+            cls.slides[path] = {
+                "source": f"{source_size.width()}x{source_size.height()}",
+                "decoded": f"{image.width()}x{image.height()}",
+                "bytes_saved": saved,
+            }
+            if len(cls.slides) > cls.SLIDE_ENTRIES:
+                cls.slides.popitem(last=False)
+            cls.decoded_bytes += image.sizeInBytes()
+            cls.saved_bytes += saved
+        return saved
+
+    @classmethod
+    def slide(cls, path):
+        with cls.lock:
+            return cls.slides.get(path)
+
+    @classmethod
+    def stats(cls):
+        with cls.lock:
+            return {
+                "slides": len(cls.slides),
+                "decoded_bytes": cls.decoded_bytes,
+                "saved_bytes": cls.saved_bytes,
+            }
 
 
 class AnimatedDialog(QDialog):
@@ -84,6 +725,9 @@ class AnimatedDialog(QDialog):
         self.scale_anim.setDuration(300)
         self.scale_anim.setEasingCurve(QEasingCurve.OutBack)
 
+        # Кнопки переиспользуются между показами: (кнопка, текущий стиль)
+        self.buttons = []
+
         self.setFixedSize(400, 200)
 
     def showEvent(self, event):
@@ -94,14 +738,16 @@ class AnimatedDialog(QDialog):
             y = parent_rect.y() + (parent_rect.height() - self.height()) // 2
             self.move(x, y)
 
-        # Начальное состояние для анимации
-        start_rect = QRect(self.main_widget.geometry())
-        start_rect.setWidth(10)
-        start_rect.setHeight(10)
-        start_rect.moveCenter(self.main_widget.geometry().center())
+        # Начальное состояние для анимации (диалог может быть показан повторно,
+        # поэтому конечную геометрию берем от размера диалога, а не от текущей)
+        self.opacity_anim.stop()
+        self.scale_anim.stop()
+        end_rect = QRect(QPoint(0, 0), self.size())
+        start_rect = QRect(0, 0, 10, 10)
+        start_rect.moveCenter(end_rect.center())
 
         self.scale_anim.setStartValue(start_rect)
-        self.scale_anim.setEndValue(self.main_widget.geometry())
+        self.scale_anim.setEndValue(end_rect)
 
         # Запускаем анимации
         self.opacity_anim.start()
@@ -113,9 +759,26 @@ class AnimatedDialog(QDialog):
         self.main_widget.resize(self.size())
         super().resizeEvent(event)
 
-    def addButton(self, text, style=""):
-        btn = QPushButton(text)
-        btn.setStyleSheet(f"""
+    def set_buttons(self, buttons):
+        # Меняем только текст и стиль уже созданных кнопок, лишние прячем
+        for i, (text, style) in enumerate(buttons):
+            if i < len(self.buttons):
+                btn, current_style = self.buttons[i]
+                btn.setText(text)
+                if style != current_style:
+                    btn.setStyleSheet(self.button_style(style))
+                    self.buttons[i] = (btn, style)
+                btn.show()
+            else:
+                btn = self.addButton(text, style)
+                btn.clicked.connect(self.accept)
+                self.buttons.append((btn, style))
+        for btn, _ in self.buttons[len(buttons):]:
+            btn.hide()
+
+    @staticmethod
+    def button_style(style):
+        return f"""
             QPushButton {{
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
                                         stop:0 #ff3355, stop:1 #cc0022);
@@ -132,26 +795,58 @@ class AnimatedDialog(QDialog):
                                         stop:0 #ff5375, stop:1 #dd2042);
                 border: 2px solid #ffffff;
             }}
-        """)
+        """
+
+    def addButton(self, text, style=""):
+        btn = QPushButton(text)
+        btn.setStyleSheet(self.button_style(style))
         self.button_layout.addWidget(btn)
         return btn
 
 
 class NotificationManager:
-    @staticmethod
-    def show_message(parent, title, message, buttons=None, icon=None):
-        dialog = AnimatedDialog(parent)
+    # Готовые диалоги по родителю: строим один раз, дальше меняем только текст
+    pool = {}
+    constructed = 0
+    reused = 0
+
+    @classmethod
+    def acquire(cls, parent):
+        if parent not in cls.pool:
+            cls.pool[parent] = []
+            if parent is not None:
+                parent.destroyed.connect(lambda: cls.pool.pop(parent, None))
+
+        idle = cls.pool[parent]
+        if idle:
+            cls.reused += 1
+            return idle.pop()
+        cls.constructed += 1
+        return AnimatedDialog(parent)
+
+    @classmethod
+    def release(cls, parent, dialog):
+        if parent in cls.pool:
+            cls.pool[parent].append(dialog)
+
+    @classmethod
+    def stats(cls):
+        return {"constructed": cls.constructed, "reused": cls.reused}
+
+    @classmethod
+    def show_message(cls, parent, title, message, buttons=None, icon=None):
+        dialog = cls.acquire(parent)
         dialog.title_label.setText(title)
         dialog.message_label.setText(message)
 
         if buttons is None:
             buttons = [("OK 👍", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #3366ff, stop:1 #2244cc);")]
+        dialog.set_buttons(buttons)
 
-        for btn_text, btn_style in buttons:
-            btn = dialog.addButton(btn_text, btn_style)
-            btn.clicked.connect(dialog.accept)
-
-        result = dialog.exec_()
+        try:
+            result = dialog.exec_()
+        finally:
+            cls.release(parent, dialog)
         return result
 
 
@@ -256,14 +951,15 @@ class SuccessDialog(QDialog):
             parent_center = self.parent().geometry().center()
             self.move(parent_center - QPoint(200, 100))
 
-        # Начальное состояние для анимации
-        start_rect = QRect(self.main_widget.geometry())
-        start_rect.setWidth(10)
-        start_rect.setHeight(10)
-        start_rect.moveCenter(self.main_widget.geometry().center())
+        # Начальное состояние для анимации (диалог показывается повторно)
+        self.opacity_anim.stop()
+        self.scale_anim.stop()
+        end_rect = QRect(QPoint(0, 0), self.size())
+        start_rect = QRect(0, 0, 10, 10)
+        start_rect.moveCenter(end_rect.center())
 
         self.scale_anim.setStartValue(start_rect)
-        self.scale_anim.setEndValue(self.main_widget.geometry())
+        self.scale_anim.setEndValue(end_rect)
 
         # Запускаем анимации
         self.opacity_anim.start()
@@ -276,12 +972,975 @@ class SuccessDialog(QDialog):
         super().resizeEvent(event)
 
 
+class ToastOverlay(QWidget):
+    DURATION_MS = 1800
+    FADE_MS = 200
+    TOP_MARGIN = 30
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        # Тост не перехватывает клики и фокус: ввод кода продолжается
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WA_StyledBackground)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setStyleSheet("""
+            ToastOverlay {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                        stop:0 #1a0a1a, stop:1 #0a0a2a);
+                border-radius: 12px;
+                border: 2px solid #ff3355;
+            }
+            QLabel {
+                color: #ffffff;
+                font-size: 20px;
+                font-weight: bold;
+                background: transparent;
+                border: none;
+            }
+        """)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(25, 15, 25, 15)
+        self.label = QLabel()
+        self.label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.label)
+
+        self.message = None
+        self.count = 0
+
+        self.opacity = QGraphicsOpacityEffect(self)
+        self.opacity.setOpacity(0)
+        self.setGraphicsEffect(self.opacity)
+
+        self.fade_anim = QPropertyAnimation(self.opacity, b"opacity", self)
+        self.fade_anim.setDuration(self.FADE_MS)
+        self.fade_anim.setEasingCurve(QEasingCurve.OutCubic)
+        self.fade_anim.finished.connect(self.on_fade_finished)
+
+        self.hide_timer = QTimer(self)
+        self.hide_timer.setSingleShot(True)
+        self.hide_timer.timeout.connect(lambda: self.fade_to(0))
+
+        self.hide()
+
+    def show_message(self, message):
+        # Одинаковые сообщения подряд сливаются в один тост со счетчиком
+        if self.isVisible() and message == self.message:
+            self.count += 1
+        else:
+            self.message = message
+            self.count = 1
+
+        self.label.setText(message if self.count == 1 else f"{message} ×{self.count}")
+        self.adjustSize()
+        self.reposition()
+        self.show()
+        self.raise_()
+        self.fade_to(1)
+        self.hide_timer.start(self.DURATION_MS)
+
+    def dismiss(self):
+        self.hide_timer.stop()
+        self.fade_anim.stop()
+        self.opacity.setOpacity(0)
+        self.hide()
+
+    def fade_to(self, value):
+        if self.fade_anim.endValue() == value and self.fade_anim.state() == QPropertyAnimation.Running:
+            return
+        self.fade_anim.stop()
+        self.fade_anim.setStartValue(self.opacity.opacity())
+        self.fade_anim.setEndValue(value)
+        self.fade_anim.start()
+
+    def on_fade_finished(self):
+        if self.opacity.opacity() == 0:
+            self.hide()
+
+    def reposition(self):
+        parent = self.parentWidget()
+        if parent is not None:
+            self.move((parent.width() - self.width()) // 2, self.TOP_MARGIN)
+
+
+class PreflightOverlay(QWidget):
+    # Закрывает просмотр, пока перед показом проверяются и прогреваются слайды
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_StyledBackground)
+        self.setStyleSheet("""
+            PreflightOverlay {
+                background-color: rgba(10, 10, 10, 230);
+            }
+            QLabel {
+                color: #ffffff;
+                font-size: 22px;
+                font-weight: bold;
+                background: transparent;
+            }
+            QProgressBar {
+                border: 2px solid #3366ff;
+                border-radius: 5px;
+                background-color: #1a0a1a;
+                color: #ffffff;
+                font-weight: bold;
+                text-align: center;
+                min-height: 30px;
+            }
+            QProgressBar::chunk {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                        stop:0 #3366ff, stop:1 #ff3355);
+            }
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                        stop:0 #ff3355, stop:1 #cc0022);
+                color: white;
+                font-weight: bold;
+                padding: 10px;
+                border-radius: 5px;
+                border: 2px solid #ffffff;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(80, 0, 80, 0)
+        layout.addStretch(1)
+        self.label = QLabel("🚀 Подготовка слайд-шоу...")
+        self.label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.label)
+        self.progress = QProgressBar()
+        layout.addWidget(self.progress)
+        self.btn_cancel = QPushButton("⛔ Отмена")
+        layout.addWidget(self.btn_cancel, alignment=Qt.AlignCenter)
+        layout.addStretch(1)
+
+        self.hide()
+
+    def start(self, total):
+        self.progress.setRange(0, total)
+        self.progress.setValue(0)
+        self.setGeometry(self.parentWidget().rect())
+        self.show()
+        self.raise_()
+
+    def set_progress(self, done, total):
+        self.progress.setRange(0, total)
+        self.progress.setValue(done)
+
+
+class ThumbnailStore:
+    INDEX_NAME = "index.json"
+    MEMORY_ENTRIES = 4096
+
+    def __init__(self, directory, limit_bytes):
+        self.directory = directory
+        self.limit_bytes = limit_bytes
+        # Миниатюры строятся и в GUI-потоке, и в фоновом импорте
+        self.lock = threading.RLock()
+        # path -> [размер файла, mtime_ns, хэш содержимого], чтобы не хэшировать файл повторно
+        self.index = {}
+        self.index_dirty = False
+        self.memory = OrderedDict()
+        self.total_bytes = None
+        self.load_index()
+
+    def configure(self, directory, limit_bytes):
+        with self.lock:
+            if directory != self.directory:
+                self.flush()
+                self.directory = directory
+                self.index = {}
+                self.memory.clear()
+                self.total_bytes = None
+                self.load_index()
+            self.limit_bytes = limit_bytes
+
+    def load_index(self):
+        try:
+            with open(os.path.join(self.directory, self.INDEX_NAME), "r") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def flush(self):
+        with self.lock:
+            if not self.index_dirty:
+                return
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = os.path.join(self.directory, self.INDEX_NAME + ".tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump(self.index, f)
+                os.replace(tmp_path, os.path.join(self.directory, self.INDEX_NAME))
+                self.index_dirty = False
+            except OSError:
+                pass
+
+    @staticmethod
+    def content_hash(path):
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def decode_thumbnail(path):
+        # Уменьшенное декодирование: JPEG-плагин масштабирует прямо при распаковке
+        reader = QImageReader(path)
+        size = reader.size()
+        if size.isValid():
+            reader.setScaledSize(size.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return image
+        if image.width() > THUMBNAIL_SIZE or image.height() > THUMBNAIL_SIZE:
+            image = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return image
+
+    def get(self, path):
+        # У слайдов из пакета миниатюра уже лежит внутри пакета
+        ref = DeckPackage.split_ref(path)
+        if ref is not None:
+            try:
+                return DeckPackage.open(ref[0]).thumbnail(ref[1])
+            except (OSError, ValueError, IndexError):
+                return QImage()
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return QImage()
+
+        memory_key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            image = self.memory.get(memory_key)
+            if image is not None:
+                self.memory.move_to_end(memory_key)
+                return image
+            entry = self.index.get(path)
+
+        # Хэширование и декодирование идут без блокировки
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            try:
+                entry = [stat.st_size, stat.st_mtime_ns, self.content_hash(path)]
+            except OSError:
+                return QImage()
+            with self.lock:
+                self.index[path] = entry
+                self.index_dirty = True
+
+        thumb_path = os.path.join(self.directory, f"{entry[2]}_{entry[1]}.png")
+        image = QImage(thumb_path)
+        if image.isNull():
+            image = self.decode_thumbnail(path)
+            if not image.isNull():
+                self.save_thumbnail(thumb_path, image)
+
+        with self.lock:
+            self.memory[memory_key] = image
+            if len(self.memory) > self.MEMORY_ENTRIES:
+                self.memory.popitem(last=False)
+        return image
+
+    def forget(self, paths):
+        # Устаревшие миниатюры измененных файлов, чтобы не ждать вытеснения из LRU
+        paths = set(paths)
+        with self.lock:
+            for key in [key for key in self.memory if key[0] in paths]:
+                del self.memory[key]
+
+    def save_thumbnail(self, thumb_path, image):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            return
+        if not image.save(thumb_path, "PNG"):
+            return
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self.scan()[1]
+            else:
+                self.total_bytes += os.path.getsize(thumb_path)
+            if self.total_bytes > self.limit_bytes:
+                self.cleanup()
+
+    def scan(self):
+        files = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".png") and entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except OSError:
+            pass
+        return files, total
+
+    def cleanup(self):
+        # Удаляем самые старые миниатюры, пока кэш не станет меньше 90% лимита
+        with self.lock:
+            files, total = self.scan()
+            files.sort()
+            target = self.limit_bytes * 0.9
+            removed = set()
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed.add(os.path.basename(path))
+            self.total_bytes = total
+
+            if removed:
+                for path, entry in list(self.index.items()):
+                    if f"{entry[2]}_{entry[1]}.png" in removed:
+                        del self.index[path]
+                        self.index_dirty = True
+                self.flush()
+
+
+class ImportSignals(QObject):
+    finished = pyqtSignal(int, list)
+
+
+class ImportTask(QRunnable):
+    def __init__(self, start, paths, thumbnails, cancel_event):
+        super().__init__()
+        self.start = start
+        self.paths = paths
+        self.thumbnails = thumbnails
+        self.cancel_event = cancel_event
+        self.signals = ImportSignals()
+
+    def run(self):
+        # Файл годен, если из него удалось построить миниатюру
+        results = []
+        for path in self.paths:
+            if self.cancel_event.is_set():
+                return
+            results.append(not self.thumbnails.get(path).isNull())
+        self.signals.finished.emit(self.start, results)
+
+
+class ImportJob(QObject):
+    rows_ready = pyqtSignal(list)
+    progress = pyqtSignal(int, int, float)
+    finished = pyqtSignal(int, int, bool)
+
+    CHUNK_SIZE = 16
+    BATCH_INTERVAL_MS = 100
+
+    def __init__(self, files, thumbnails, workers, parent=None):
+        super().__init__(parent)
+        self.files = list(files)
+        self.thumbnails = thumbnails
+        self.valid = [None] * len(self.files)
+        self.done = 0
+        self.next_row = 0
+        self.added = 0
+        self.skipped = 0
+        self.active = False
+        self.started_at = 0.0
+        self.tasks = []
+        self.cancel_event = threading.Event()
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+
+        # Строки добавляются в список пачками, а не по одной
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setInterval(self.BATCH_INTERVAL_MS)
+        self.batch_timer.timeout.connect(self.flush)
+
+    def start(self):
+        self.active = True
+        self.started_at = time.perf_counter()
+        for start in range(0, len(self.files), self.CHUNK_SIZE):
+            task = ImportTask(start, self.files[start:start + self.CHUNK_SIZE], self.thumbnails, self.cancel_event)
+            task.signals.finished.connect(self.on_chunk_finished)
+            self.tasks.append(task)
+            self.pool.start(task)
+        self.batch_timer.start()
+        if not self.files:
+            self.finish(False)
+
+    def cancel(self):
+        if not self.active:
+            return
+        self.cancel_event.set()
+        self.pool.clear()
+        self.finish(True)
+
+    def on_chunk_finished(self, start, results):
+        if not self.active:
+            return
+        self.valid[start:start + len(results)] = results
+        self.done += len(results)
+
+        elapsed = time.perf_counter() - self.started_at
+        self.progress.emit(self.done, len(self.files), self.done / elapsed if elapsed > 0 else 0.0)
+        if self.done >= len(self.files):
+            self.finish(False)
+
+    def flush(self):
+        # Добавляем только непрерывный готовый префикс, чтобы сохранить порядок выбора
+        batch = []
+        while self.next_row < len(self.files) and self.valid[self.next_row] is not None:
+            if self.valid[self.next_row]:
+                batch.append(self.files[self.next_row])
+            else:
+                self.skipped += 1
+            self.next_row += 1
+        if batch:
+            self.added += len(batch)
+            self.rows_ready.emit(batch)
+
+    def finish(self, cancelled):
+        self.active = False
+        self.batch_timer.stop()
+        self.flush()
+        self.tasks = []
+        self.thumbnails.flush()
+        self.finished.emit(self.added, self.skipped, cancelled)
+
+
+class ThumbnailSignals(QObject):
+    finished = pyqtSignal(str, int, QImage)
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, thumbnails, path, row):
+        super().__init__()
+        self.thumbnails = thumbnails
+        self.path = path
+        self.row = row
+        self.signals = ThumbnailSignals()
+        # Задачей владеет загрузчик, иначе tryTake мог бы обратиться к уже удаленной задаче
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.signals.finished.emit(self.path, self.row, self.thumbnails.get(self.path))
+
+
+class ThumbnailLoader(QObject):
+    # Миниатюры строк у видимой области; запросы ушедших из вида строк снимаются из очереди
+    loaded = pyqtSignal(str, int, QImage)
+
+    def __init__(self, thumbnails, workers=2, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+        self.pending = {}
+
+    def configure(self, workers):
+        self.pool.setMaxThreadCount(max(1, workers))
+
+    def request(self, path, row, priority=0):
+        if path in self.pending:
+            return
+        task = ThumbnailTask(self.thumbnails, path, row)
+        task.signals.finished.connect(self.on_finished)
+        self.pending[path] = task
+        self.pool.start(task, priority)
+
+    def retain(self, paths):
+        # Уже запущенные задачи не снять - их результат просто попадет в кэш
+        for path, task in list(self.pending.items()):
+            if path not in paths and self.pool.tryTake(task):
+                del self.pending[path]
+
+    def on_finished(self, path, row, image):
+        if self.pending.pop(path, None) is not None:
+            self.loaded.emit(path, row, image)
+
+    def shutdown(self):
+        self.pool.clear()
+        self.pool.waitForDone()
+        self.pending.clear()
+
+
+class DeckWatcher(QObject):
+    # Следит за файлами колоды и их каталогами: каталог нужен, чтобы поймать замену файла
+    # через переименование, после которой наблюдение за самим файлом теряется
+    changed = pyqtSignal(list)
+    removed = pyqtSignal(list)
+
+    BATCH_DELAY_MS = 300
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+
+        # path -> (размер, mtime_ns) или None, если файла нет
+        self.snapshot = {}
+        self.by_directory = {}
+        self.pending_files = set()
+        self.pending_directories = set()
+
+        # Пачка событий от одного сохранения разбирается за раз
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.setInterval(self.BATCH_DELAY_MS)
+        self.batch_timer.timeout.connect(self.process)
+
+    @staticmethod
+    def file_state(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def set_paths(self, paths):
+        wanted = {path for path in paths if DeckPackage.split_ref(path) is None}
+        added = wanted - self.snapshot.keys()
+        gone = self.snapshot.keys() - wanted
+
+        for path in gone:
+            del self.snapshot[path]
+            directory = os.path.dirname(path)
+            self.by_directory[directory].discard(path)
+            if not self.by_directory[directory]:
+                del self.by_directory[directory]
+                self.watcher.removePath(directory)
+        if gone:
+            watched = set(self.watcher.files())
+            self.watcher.removePaths([path for path in gone if path in watched])
+
+        new_directories = []
+        for path in added:
+            self.snapshot[path] = self.file_state(path)
+            directory = os.path.dirname(path)
+            if directory not in self.by_directory:
+                self.by_directory[directory] = set()
+                new_directories.append(directory)
+            self.by_directory[directory].add(path)
+        existing = [path for path in added if self.snapshot[path] is not None]
+        if existing:
+            self.watcher.addPaths(existing)
+        if new_directories:
+            self.watcher.addPaths(new_directories)
+
+    def clear(self):
+        self.batch_timer.stop()
+        self.pending_files.clear()
+        self.pending_directories.clear()
+        self.set_paths([])
+
+    def on_file_changed(self, path):
+        self.pending_files.add(path)
+        if not self.batch_timer.isActive():
+            self.batch_timer.start()
+
+    def on_directory_changed(self, directory):
+        self.pending_directories.add(directory)
+        if not self.batch_timer.isActive():
+            self.batch_timer.start()
+
+    def process(self):
+        candidates = set(self.pending_files)
+        for directory in self.pending_directories:
+            candidates |= self.by_directory.get(directory, set())
+        self.pending_files.clear()
+        self.pending_directories.clear()
+
+        changed = []
+        removed = []
+        rewatch = []
+        watched = set(self.watcher.files())
+        for path in candidates:
+            if path not in self.snapshot:
+                continue
+            state = self.file_state(path)
+            if state == self.snapshot[path]:
+                continue
+            self.snapshot[path] = state
+            if state is None:
+                removed.append(path)
+                continue
+            changed.append(path)
+            if path not in watched:
+                rewatch.append(path)
+
+        if rewatch:
+            self.watcher.addPaths(rewatch)
+        if changed:
+            self.changed.emit(changed)
+        if removed:
+            self.removed.emit(removed)
+
+
+class SlideListModel(QAbstractListModel):
+    PathRole = Qt.UserRole
+    CodeRole = Qt.UserRole + 1
+    MissingRole = Qt.UserRole + 2
+    ROWS_MIME_TYPE = "application/x-slideshow-rows"
+    RECONCILE_MAX_RUNS = 64
+    DECORATION_ENTRIES = 2048
+
+    # Готова миниатюра строки. Не dataChanged: на него QListView перекладывает все строки
+    thumbnail_ready = pyqtSignal(QModelIndex)
+
+    placeholder = None
+
+    def __init__(self, thumbnails, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self.images = []
+        self.codes = {}
+        # Файлы, удаленные с диска после загрузки колоды
+        self.missing = set()
+
+        # Готовые миниатюры для отрисовки; остальные грузятся в фоне, а пока рисуется заглушка
+        self.decorations = OrderedDict()
+        self.loader = ThumbnailLoader(thumbnails, DEFAULT_SETTINGS["thumbnail_workers"], self)
+        self.loader.loaded.connect(self.on_thumbnail_loaded)
+
+    @classmethod
+    def placeholder_image(cls):
+        if cls.placeholder is None:
+            cls.placeholder = QImage(THUMBNAIL_SIZE, THUMBNAIL_SIZE * 3 // 4, QImage.Format_RGB32)
+            cls.placeholder.fill(QColor("#2a1a2a"))
+        return cls.placeholder
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.images)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.images):
+            return None
+
+        path = self.images[index.row()]
+        if role == Qt.DisplayRole:
+            return slide_name(path)
+        if role == Qt.DecorationRole:
+            # Миниатюра запрашивается только при отрисовке видимой строки
+            return self.decoration(index.row(), path)
+        if role == self.CodeRole:
+            return self.codes.get(path, "")
+        if role == self.MissingRole:
+            return path in self.missing
+        if role in (self.PathRole, Qt.ToolTipRole):
+            return path
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # Бросать можно только между строками, а не на строку
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [self.ROWS_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        # Перетаскиваются только номера строк, а не изображения
+        data = QMimeData()
+        rows = sorted({index.row() for index in indexes if index.isValid()})
+        data.setData(self.ROWS_MIME_TYPE, json.dumps(rows).encode())
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if action != Qt.MoveAction or not data.hasFormat(self.ROWS_MIME_TYPE):
+            return False
+        rows = json.loads(bytes(data.data(self.ROWS_MIME_TYPE)).decode())
+        if row < 0:
+            row = parent.row() if parent.isValid() else len(self.images)
+        # row - место вставки в текущем списке, пересчитываем в позицию после перемещения
+        self.move_rows(rows, row - sum(1 for r in rows if r < row))
+        return True
+
+    def set_deck(self, images, codes):
+        self.beginResetModel()
+        self.images = list(images)
+        self.codes = dict(codes)
+        self.missing &= set(self.images)
+        self.endResetModel()
+
+    def reconcile(self, images, codes):
+        # Приводим модель к новой колоде минимальными изменениями: лишние строки удаляются,
+        # недостающие добавляются в конец, затем одна перестановка и перерисовка измененных кодов
+        images = list(images)
+        wanted = {}
+        for path in images:
+            wanted[path] = wanted.get(path, 0) + 1
+
+        kept = {}
+        removed = []
+        for row, path in enumerate(self.images):
+            if kept.get(path, 0) < wanted.get(path, 0):
+                kept[path] = kept.get(path, 0) + 1
+            else:
+                removed.append(row)
+
+        runs = []
+        for row in removed:
+            if runs and runs[-1][1] == row - 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+        if len(runs) > self.RECONCILE_MAX_RUNS:
+            # Разрозненных удалений слишком много - один сброс дешевле
+            self.set_deck(images, codes)
+            return
+        for first, last in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.images[first:last + 1]
+            self.endRemoveRows()
+
+        added = []
+        for path in images:
+            if kept.get(path, 0) > 0:
+                kept[path] -= 1
+            else:
+                added.append(path)
+        # Только строки, оставшиеся от старой колоды: добавленные объявит вставка
+        changed_codes = {path for path in set(self.images) if self.codes.get(path, "") != codes.get(path, "")}
+        self.codes = dict(codes)
+        self.append_images(added, {})
+
+        rows = {}
+        for row, path in enumerate(self.images):
+            rows.setdefault(path, deque()).append(row)
+        self.reorder([rows[path].popleft() for path in images])
+
+        self.missing &= set(self.images)
+        if changed_codes:
+            self.emit_rows_changed(
+                [row for row, path in enumerate(self.images) if path in changed_codes], [self.CodeRole]
+            )
+
+    def append_images(self, images, codes):
+        if not images:
+            return
+        first = len(self.images)
+        self.beginInsertRows(QModelIndex(), first, first + len(images) - 1)
+        self.images.extend(images)
+        self.codes.update(codes)
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        # Один проход по списку и одно уведомление вида вместо удаления по строке
+        removed = set(rows)
+        if not removed:
+            return 0
+        self.beginResetModel()
+        kept = [path for row, path in enumerate(self.images) if row not in removed]
+        gone = {self.images[row] for row in removed} - set(kept)
+        self.images = kept
+        for path in gone:
+            self.codes.pop(path, None)
+        self.missing -= gone
+        self.endResetModel()
+        return len(removed)
+
+    def rows_for_paths(self, paths):
+        paths = set(paths)
+        return [row for row, path in enumerate(self.images) if path in paths]
+
+    def reorder(self, order):
+        # order - старые номера строк в новом порядке; меняется только порядок путей
+        if order == list(range(len(self.images))):
+            return False
+        self.layoutAboutToBeChanged.emit()
+        new_rows = [0] * len(order)
+        for new_row, old_row in enumerate(order):
+            new_rows[old_row] = new_row
+        self.images = [self.images[old_row] for old_row in order]
+
+        old_indexes = self.persistentIndexList()
+        new_indexes = [self.index(new_rows[index.row()]) for index in old_indexes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+        return True
+
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_child):
+        # Используется QListView при перетаскивании внутри списка
+        if source_parent.isValid() or destination_parent.isValid():
+            return False
+        last = source_row + count - 1
+        if not self.beginMoveRows(QModelIndex(), source_row, last, QModelIndex(), destination_child):
+            return False
+        block = self.images[source_row:last + 1]
+        del self.images[source_row:last + 1]
+        target = destination_child - count if destination_child > source_row else destination_child
+        self.images[target:target] = block
+        self.endMoveRows()
+        return True
+
+    def move_rows(self, rows, position):
+        # Выбранные строки встают единым блоком, первая - на позицию position
+        moved = sorted(set(rows))
+        moved_set = set(moved)
+        rest = [row for row in range(len(self.images)) if row not in moved_set]
+        position = max(0, min(position, len(rest)))
+        return self.reorder(rest[:position] + moved + rest[position:])
+
+    def shift_rows(self, rows, delta):
+        # Каждая выбранная строка сдвигается на одну позицию, если не уперлась в край или в соседнюю выбранную
+        order = list(range(len(self.images)))
+        selected = set(rows)
+        for row in sorted(selected, reverse=delta > 0):
+            target = row + delta
+            if 0 <= target < len(order) and order[target] not in selected:
+                order[row], order[target] = order[target], order[row]
+        return self.reorder(order)
+
+    def decoration(self, row, path):
+        image = self.decorations.get(path)
+        if image is not None:
+            self.decorations.move_to_end(path)
+            return image
+        self.loader.request(path, row, 1)
+        return self.placeholder_image()
+
+    def prefetch_thumbnails(self, first, last, margin):
+        # Видимые строки первыми, затем запас вокруг; все прочие запросы отменяются
+        wanted = set()
+        for row in range(max(0, first - margin), min(len(self.images), last + margin + 1)):
+            path = self.images[row]
+            wanted.add(path)
+            if path not in self.decorations:
+                self.loader.request(path, row, 1 if first <= row <= last else 0)
+        self.loader.retain(wanted)
+
+    def on_thumbnail_loaded(self, path, row, image):
+        self.decorations[path] = image
+        self.decorations.move_to_end(path)
+        if len(self.decorations) > self.DECORATION_ENTRIES:
+            self.decorations.popitem(last=False)
+
+        if not (0 <= row < len(self.images) and self.images[row] == path):
+            # Строку успели сдвинуть - ищем, где она теперь
+            row = self.images.index(path) if path in self.images else -1
+        if row >= 0:
+            self.thumbnail_ready.emit(self.index(row))
+
+    def refresh_paths(self, paths, missing=False):
+        # Перерисовываем только строки измененных файлов, без сброса модели
+        paths = set(paths)
+        for path in paths:
+            self.decorations.pop(path, None)
+        if missing:
+            self.missing |= paths
+        else:
+            self.missing -= paths
+        rows = [row for row, path in enumerate(self.images) if path in paths]
+        self.emit_rows_changed(rows, [Qt.DecorationRole, self.MissingRole])
+
+    def emit_rows_changed(self, rows, roles):
+        # По уведомлению на непрерывную группу строк: диапазон от первой до последней
+        # объявил бы измененными и все строки между ними
+        start = end = None
+        for row in rows:
+            if end is not None and row == end + 1:
+                end = row
+                continue
+            if start is not None:
+                self.dataChanged.emit(self.index(start), self.index(end), roles)
+            start = end = row
+        if start is not None:
+            self.dataChanged.emit(self.index(start), self.index(end), roles)
+
+    def code(self, row):
+        return self.codes.get(self.images[row], "")
+
+    def set_code(self, row, code):
+        path = self.images[row]
+        self.codes[path] = code
+        # Код общий для всех строк с тем же файлом
+        for i, image in enumerate(self.images):
+            if image == path:
+                index = self.index(i)
+                self.dataChanged.emit(index, index, [self.CodeRole])
+
+
+class SlideItemDelegate(QStyledItemDelegate):
+    PADDING = 5
+    SPACING = 8
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), THUMBNAIL_SIZE + 2 * self.PADDING + 4)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+
+        # Фон и рамка выбранной строки (как раньше у виджета строки)
+        if option.state & QStyle.State_Selected:
+            painter.setPen(QPen(QColor("#ff3355"), 2))
+            painter.setBrush(QColor("#0a0a2a"))
+            painter.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 3, 3)
+        else:
+            painter.setPen(QColor("#444444"))
+            painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+
+        content = rect.adjusted(self.PADDING + 2, self.PADDING, -self.PADDING - 2, -self.PADDING)
+
+        icon_rect = QRect(content.left(), content.top(), THUMBNAIL_SIZE, content.height())
+        thumbnail = index.data(Qt.DecorationRole)
+        if thumbnail is not None and not thumbnail.isNull():
+            target = QRect(QPoint(0, 0), thumbnail.size())
+            target.moveCenter(icon_rect.center())
+            painter.drawImage(target, thumbnail)
+
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        metrics = QFontMetrics(font)
+
+        code_text = f"🔓 Код: {index.data(SlideListModel.CodeRole)}"
+        code_width = metrics.horizontalAdvance(code_text)
+        code_rect = QRect(content.right() - code_width, content.top(), code_width, content.height())
+        painter.setPen(QColor("#ff3355"))
+        painter.drawText(code_rect, Qt.AlignVCenter | Qt.AlignRight, code_text)
+
+        name_left = icon_rect.right() + self.SPACING
+        name_rect = QRect(name_left, content.top(), code_rect.left() - self.SPACING - name_left, content.height())
+        name = index.data(Qt.DisplayRole)
+        if index.data(SlideListModel.MissingRole):
+            name = f"⚠ {name} (файл удален)"
+            painter.setPen(QColor("#888888"))
+        else:
+            painter.setPen(QColor("#ffffff"))
+        name = metrics.elidedText(name, Qt.ElideMiddle, max(0, name_rect.width()))
+        painter.drawText(name_rect, Qt.AlignVCenter | Qt.AlignLeft, name)
+
+        painter.restore()
+
+
 class ImageCodeEditor(QWidget):
+    loaded = pyqtSignal()
+    files_changed = pyqtSignal(list)
+    code_saved = pyqtSignal(str, str)
+
+    LOAD_CHUNK = 1000
+
     def __init__(self):
         super().__init__()
         self.initUI()
         self.current_selected = None
 
+        # Постепенное заполнение списка после появления окна
+        self.pending_images = []
+        self.load_timer = QTimer(self)
+        self.load_timer.setSingleShot(True)
+        self.load_timer.timeout.connect(self.load_next_chunk)
+
     def initUI(self):
         self.layout = QVBoxLayout()
         self.layout.setSpacing(15)
@@ -302,7 +1961,7 @@ class ImageCodeEditor(QWidget):
             QPushButton:hover {
                 opacity: 0.9;
             }
-            QListWidget {
+            QListView {
                 border: 2px solid #3366ff;
                 border-radius: 5px;
                 font-size: 14px;
@@ -310,14 +1969,6 @@ class ImageCodeEditor(QWidget):
                 background-color: #1a0a1a;
                 outline: none;
             }
-            QListWidget::item {
-                border-bottom: 1px solid #444;
-            }
-            QListWidget::item:selected {
-                background-color: #0a0a2a;
-                border: 2px solid #ff3355;
-                border-radius: 3px;
-            }
             QLineEdit {
                 padding: 8px;
                 border: 2px solid #3366ff;
@@ -348,6 +1999,12 @@ class ImageCodeEditor(QWidget):
                                     stop:0 #ff3355, stop:1 #cc0022);
             color: white;
         """)
+        self.btn_remove_broken = QPushButton("🧹 Удалить битые")
+        self.btn_remove_broken.setStyleSheet("""
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                    stop:0 #ff3355, stop:1 #cc0022);
+            color: white;
+        """)
         self.btn_move_up = QPushButton("⬆ Вверх")
         self.btn_move_up.setStyleSheet("""
             background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
@@ -363,17 +2020,96 @@ class ImageCodeEditor(QWidget):
 
         self.btn_add.setMinimumHeight(40)
         self.btn_remove.setMinimumHeight(40)
+        self.btn_remove_broken.setMinimumHeight(40)
         self.btn_move_up.setMinimumHeight(30)
         self.btn_move_down.setMinimumHeight(30)
 
+        self.btn_move_to = QPushButton("🔢 На позицию…")
+        self.btn_move_to.setStyleSheet("""
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                    stop:0 #3366ff, stop:1 #2244cc);
+            color: white;
+        """)
+        self.btn_move_to.setMinimumHeight(30)
+
+        # Панель фонового импорта (видна только во время импорта)
+        self.import_panel = QWidget()
+        import_layout = QHBoxLayout(self.import_panel)
+        import_layout.setContentsMargins(0, 0, 0, 0)
+        self.import_progress = QProgressBar()
+        self.import_progress.setStyleSheet("""
+            QProgressBar {
+                border: 2px solid #3366ff;
+                border-radius: 5px;
+                background-color: #1a0a1a;
+                color: #ffffff;
+                font-weight: bold;
+                text-align: center;
+            }
+            QProgressBar::chunk {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                        stop:0 #3366ff, stop:1 #ff3355);
+            }
+        """)
+        self.import_status = QLabel()
+        self.btn_cancel_import = QPushButton("⛔ Отмена")
+        self.btn_cancel_import.setStyleSheet("""
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                    stop:0 #ff3355, stop:1 #cc0022);
+            color: white;
+        """)
+        import_layout.addWidget(self.import_progress, stretch=1)
+        import_layout.addWidget(self.import_status)
+        import_layout.addWidget(self.btn_cancel_import)
+        self.import_panel.hide()
+        self.import_job = None
+        self.check_job = None
+        self.import_workers = DEFAULT_SETTINGS["import_workers"]
+
         line1 = QFrame()
         line1.setFrameShape(QFrame.HLine)
         line1.setFrameShadow(QFrame.Sunken)
         line1.setStyleSheet("color: #ff3355;")
 
-        self.list_images = QListWidget()
+        self.thumbnails = ThumbnailStore(
+            DEFAULT_SETTINGS["thumbnail_cache_dir"],
+            DEFAULT_SETTINGS["thumbnail_cache_mb"] * 1024 * 1024
+        )
+        self.model = SlideListModel(self.thumbnails, self)
+
+        # Необязательное слежение за файлами колоды на диске
+        self.watch_files = False
+        self.watcher = DeckWatcher(self)
+        self.watcher.changed.connect(self.on_files_changed)
+        self.watcher.removed.connect(self.on_files_removed)
+        self.model.modelReset.connect(self.sync_watcher)
+        self.model.rowsInserted.connect(self.sync_watcher)
+        self.model.rowsRemoved.connect(self.sync_watcher)
+
+        # Строки рисует делегат: отдельных виджетов на строку нет,
+        # а при одинаковой высоте строк вид опрашивает только видимые
+        self.list_images = QListView()
+        self.list_images.setModel(self.model)
+        self.list_images.setItemDelegate(SlideItemDelegate(self.list_images))
+        self.list_images.setUniformItemSizes(True)
         self.list_images.setMinimumHeight(300)
-        self.list_images.setSelectionMode(QListWidget.SingleSelection)
+        self.list_images.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.list_images.setDragDropMode(QAbstractItemView.InternalMove)
+        self.list_images.setDefaultDropAction(Qt.MoveAction)
+        self.list_images.setDragDropOverwriteMode(False)
+
+        # Миниатюры подгружаются для видимой области с запасом, пересчет - раз за итерацию цикла
+        self.viewport_timer = QTimer(self)
+        self.viewport_timer.setSingleShot(True)
+        self.viewport_timer.timeout.connect(self.update_visible_thumbnails)
+        scroll_bar = self.list_images.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self.schedule_visible_thumbnails)
+        scroll_bar.rangeChanged.connect(self.schedule_visible_thumbnails)
+        self.model.modelReset.connect(self.schedule_visible_thumbnails)
+        self.model.layoutChanged.connect(self.schedule_visible_thumbnails)
+        self.model.rowsInserted.connect(self.schedule_visible_thumbnails)
+        self.model.rowsRemoved.connect(self.schedule_visible_thumbnails)
+        self.model.thumbnail_ready.connect(self.list_images.update)
 
         line2 = QFrame()
         line2.setFrameShape(QFrame.HLine)
@@ -383,10 +2119,12 @@ class ImageCodeEditor(QWidget):
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.btn_add)
         btn_layout.addWidget(self.btn_remove)
+        btn_layout.addWidget(self.btn_remove_broken)
 
         move_btn_layout = QHBoxLayout()
         move_btn_layout.addWidget(self.btn_move_up)
         move_btn_layout.addWidget(self.btn_move_down)
+        move_btn_layout.addWidget(self.btn_move_to)
 
         code_frame = QFrame()
         code_frame.setFrameShape(QFrame.StyledPanel)
@@ -416,12 +2154,16 @@ class ImageCodeEditor(QWidget):
 
         self.btn_add.clicked.connect(self.add_images)
         self.btn_remove.clicked.connect(self.remove_image)
+        self.btn_remove_broken.clicked.connect(self.remove_broken_images)
         self.btn_move_up.clicked.connect(self.move_up)
         self.btn_move_down.clicked.connect(self.move_down)
+        self.btn_move_to.clicked.connect(self.move_to_position)
         self.btn_save_code.clicked.connect(self.save_code)
-        self.list_images.currentItemChanged.connect(self.update_code_display)
+        self.btn_cancel_import.clicked.connect(self.cancel_import)
+        self.list_images.selectionModel().currentChanged.connect(self.update_code_display)
 
         self.layout.addLayout(btn_layout)
+        self.layout.addWidget(self.import_panel)
         self.layout.addWidget(line1)
         self.layout.addWidget(self.list_images)
         self.layout.addWidget(line2)
@@ -431,8 +2173,50 @@ class ImageCodeEditor(QWidget):
 
         self.setLayout(self.layout)
 
-        self.images = []
-        self.codes = {}
+    def apply_settings(self, settings):
+        self.thumbnails.configure(
+            settings["thumbnail_cache_dir"],
+            settings["thumbnail_cache_mb"] * 1024 * 1024
+        )
+        self.import_workers = settings["import_workers"]
+        self.model.loader.configure(settings["thumbnail_workers"])
+        if settings["watch_files"] != self.watch_files:
+            self.watch_files = settings["watch_files"]
+            if self.watch_files:
+                self.sync_watcher()
+            else:
+                self.watcher.clear()
+
+    def schedule_visible_thumbnails(self, *args):
+        if not self.viewport_timer.isActive():
+            self.viewport_timer.start(0)
+
+    def update_visible_thumbnails(self):
+        if not self.model.rowCount():
+            return
+        # Строки одной высоты, поэтому видимый диапазон считается по полосе прокрутки:
+        # indexAt у QListView перебирает все строки
+        row_height = max(1, self.list_images.sizeHintForRow(0))
+        value = self.list_images.verticalScrollBar().value()
+        if self.list_images.verticalScrollMode() == QAbstractItemView.ScrollPerPixel:
+            value //= row_height
+        first = min(value, self.model.rowCount() - 1)
+        last = min(first + self.list_images.viewport().height() // row_height, self.model.rowCount() - 1)
+        self.model.prefetch_thumbnails(first, last, last - first + 1)
+
+    def sync_watcher(self):
+        if self.watch_files:
+            self.watcher.set_paths(self.model.images)
+
+    def on_files_changed(self, paths):
+        self.thumbnails.forget(paths)
+        self.model.refresh_paths(paths)
+        self.files_changed.emit(paths)
+
+    def on_files_removed(self, paths):
+        self.thumbnails.forget(paths)
+        self.model.refresh_paths(paths, missing=True)
+        self.files_changed.emit(paths)
 
     def add_images(self):
         files, _ = QFileDialog.getOpenFileNames(
@@ -441,51 +2225,71 @@ class ImageCodeEditor(QWidget):
         )
 
         if files:
-            start_num = len(self.images) + 1
-
-            for i, file in enumerate(files, start=start_num):
-                self.images.append(file)
-                self.codes[file] = str(i)
-                self.add_image_to_list(file)
-
-    def add_image_to_list(self, file_path):
-        item = QListWidgetItem()
-        self.list_images.addItem(item)
-        self.setup_list_item(item, file_path)
-
-        if self.list_images.count() == 1:
-            self.list_images.setCurrentRow(0)
-
-    def setup_list_item(self, item, file_path):
-        widget = QWidget()
-        layout = QHBoxLayout()
-        widget.setLayout(layout)
-
-        icon_label = QLabel()
-        pixmap = QPixmap(file_path)
-        if not pixmap.isNull():
-            icon_label.setPixmap(pixmap.scaled(60, 60, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            self.start_import(files)
 
-        name_label = QLabel(os.path.basename(file_path))
-        name_label.setStyleSheet("font-weight: bold; color: #ffffff;")
-
-        code_label = QLabel(f"🔓 Код: {self.codes.get(file_path, '')}")
-        code_label.setStyleSheet("color: #ff3355; font-weight: bold;")
+    def start_import(self, files):
+        if self.import_job is not None or self.check_job is not None:
+            return
 
-        layout.addWidget(icon_label)
-        layout.addWidget(name_label, stretch=1)
-        layout.addWidget(code_label)
-        layout.setContentsMargins(5, 5, 5, 5)
+        self.import_job = ImportJob(files, self.thumbnails, self.import_workers, self)
+        self.import_job.rows_ready.connect(self.on_import_rows)
+        self.import_job.progress.connect(self.on_import_progress)
+        self.import_job.finished.connect(self.on_import_finished)
+
+        self.btn_add.setEnabled(False)
+        self.import_progress.setRange(0, len(files))
+        self.import_progress.setValue(0)
+        self.import_status.setText(f"0 / {len(files)}")
+        self.import_panel.show()
+        self.import_job.start()
+
+    def cancel_import(self):
+        if self.import_job is not None:
+            self.import_job.cancel()
+        if self.check_job is not None:
+            self.check_job.cancel()
+
+    def on_import_rows(self, files):
+        # Нумерация кодов как раньше: код нового слайда равен его номеру в списке
+        start_num = self.model.rowCount() + 1
+        codes = {file: str(i) for i, file in enumerate(files, start=start_num)}
+        self.model.append_images(files, codes)
+
+        if start_num == 1:
+            self.select_row(0)
+
+    def on_import_progress(self, done, total, rate):
+        self.import_progress.setValue(done)
+        self.import_status.setText(f"{done} / {total} • {rate:.0f} файлов/с")
+
+    def on_import_finished(self, added, skipped, cancelled):
+        self.import_job.deleteLater()
+        self.import_job = None
+        self.import_panel.hide()
+        self.btn_add.setEnabled(True)
+
+        if skipped or cancelled:
+            message = f"Добавлено изображений: {added}"
+            if skipped:
+                message += f"\nПропущено нечитаемых файлов: {skipped}"
+            if cancelled:
+                message += "\nИмпорт отменен"
+            NotificationManager.show_message(
+                self,
+                "Импорт завершен 📥",
+                message,
+                buttons=[("OK 👍", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #3366ff, stop:1 #2244cc);")]
+            )
 
-        item.setSizeHint(widget.sizeHint())
-        self.list_images.setItemWidget(item, widget)
+    def select_row(self, row):
+        self.list_images.setCurrentIndex(self.model.index(row))
 
-        if self.list_images.currentItem() == item:
-            widget.setStyleSheet("background-color: #0a0a2a; border: 2px solid #ff3355; border-radius: 3px;")
+    def current_row(self):
+        return self.list_images.currentIndex().row()
 
     def remove_image(self):
         try:
-            if not self.images or self.list_images.count() == 0:
+            if self.model.rowCount() == 0:
                 NotificationManager.show_message(
                     self,
                     "Ошибка 😕",
@@ -494,35 +2298,9 @@ class ImageCodeEditor(QWidget):
                 )
                 return
 
-            current_row = self.list_images.currentRow()
-            if current_row < 0 or current_row >= len(self.images):
-                return
-
-            self.list_images.blockSignals(True)
-            image_to_remove = self.images[current_row]
-
-            if image_to_remove in self.codes:
-                del self.codes[image_to_remove]
-
-            del self.images[current_row]
-            item = self.list_images.takeItem(current_row)
-            if item:
-                item = None
-
-            new_count = self.list_images.count()
-            if new_count > 0:
-                new_row = min(current_row, new_count - 1)
-                self.list_images.setCurrentRow(new_row)
-                self.list_images.blockSignals(False)
-                self.update_code_display(self.list_images.currentItem(), None)
-            else:
-                self.list_images.blockSignals(False)
-                self.code_input.clear()
-
-            QApplication.processEvents()
+            self.remove_rows(self.selected_rows())
 
         except Exception as e:
-            self.list_images.blockSignals(False)
             import traceback
             traceback.print_exc()
             NotificationManager.show_message(
@@ -532,77 +2310,95 @@ class ImageCodeEditor(QWidget):
                 buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
             )
 
-    def move_up(self):
-        current_row = self.list_images.currentRow()
-        if current_row > 0:
-            current_item = self.list_images.item(current_row)
-            current_widget = self.list_images.itemWidget(current_item)
-            current_image = self.images[current_row]
-
-            prev_item = self.list_images.item(current_row - 1)
-            prev_widget = self.list_images.itemWidget(prev_item)
+    def remove_broken_images(self):
+        if self.check_job is not None or self.import_job is not None or not self.model.rowCount():
+            return
 
-            self.images[current_row], self.images[current_row - 1] = (
-                self.images[current_row - 1], self.images[current_row]
-            )
+        # Проверка та же, что при импорте, и на тех же фоновых потоках: файл годен,
+        # если из него строится миниатюра. Каждый путь проверяется один раз
+        paths = list(dict.fromkeys(self.model.images))
+        self.check_job = ImportJob(paths, self.thumbnails, self.import_workers, self)
+        self.check_job.progress.connect(self.on_import_progress)
+        self.check_job.finished.connect(self.on_broken_checked)
+
+        self.btn_add.setEnabled(False)
+        self.btn_remove_broken.setEnabled(False)
+        self.import_progress.setRange(0, len(paths))
+        self.import_progress.setValue(0)
+        self.import_status.setText(f"0 / {len(paths)}")
+        self.import_panel.show()
+        self.check_job.start()
+
+    def on_broken_checked(self, added, skipped, cancelled):
+        job = self.check_job
+        self.check_job = None
+        job.deleteLater()
+        self.import_panel.hide()
+        self.btn_add.setEnabled(True)
+        self.btn_remove_broken.setEnabled(True)
+        if cancelled:
+            return
 
-            self.list_images.removeItemWidget(current_item)
-            self.list_images.removeItemWidget(prev_item)
+        # Пока шла проверка, колоду могли изменить, поэтому строки ищем заново по путям
+        broken = [path for path, valid in zip(job.files, job.valid) if valid is False]
+        removed = self.remove_rows(self.model.rows_for_paths(broken))
 
-            self.setup_list_item(current_item, self.images[current_row])
-            self.setup_list_item(prev_item, self.images[current_row - 1])
+        NotificationManager.show_message(
+            self,
+            "Готово 🧹",
+            f"Удалено битых или отсутствующих файлов: {removed}",
+            buttons=[("OK 👍", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #3366ff, stop:1 #2244cc);")]
+        )
 
-            self.list_images.setCurrentRow(current_row - 1)
+    def remove_rows(self, rows):
+        if not rows:
+            return 0
 
-    def move_down(self):
-        current_row = self.list_images.currentRow()
-        if current_row < self.list_images.count() - 1:
-            current_item = self.list_images.item(current_row)
-            current_widget = self.list_images.itemWidget(current_item)
-            current_image = self.images[current_row]
+        removed = self.model.remove_rows(rows)
+        new_count = self.model.rowCount()
+        if new_count > 0:
+            self.select_row(min(rows[0], new_count - 1))
+            self.update_code_display(self.list_images.currentIndex(), None)
+        else:
+            self.code_input.clear()
+        return removed
 
-            next_item = self.list_images.item(current_row + 1)
-            next_widget = self.list_images.itemWidget(next_item)
+    def selected_rows(self):
+        rows = sorted(index.row() for index in self.list_images.selectionModel().selectedRows())
+        if not rows and self.current_row() >= 0:
+            rows = [self.current_row()]
+        return rows
 
-            self.images[current_row], self.images[current_row + 1] = (
-                self.images[current_row + 1], self.images[current_row]
-            )
+    def move_up(self):
+        # Выделение и текущая строка следуют за перемещенными строками сами
+        self.model.shift_rows(self.selected_rows(), -1)
 
-            self.list_images.removeItemWidget(current_item)
-            self.list_images.removeItemWidget(next_item)
+    def move_down(self):
+        self.model.shift_rows(self.selected_rows(), 1)
 
-            self.setup_list_item(current_item, self.images[current_row])
-            self.setup_list_item(next_item, self.images[current_row + 1])
+    def move_to_position(self):
+        rows = self.selected_rows()
+        if not rows:
+            return
 
-            self.list_images.setCurrentRow(current_row + 1)
+        position, ok = QInputDialog.getInt(
+            self, "Переместить на позицию 🔢",
+            f"Новая позиция для выбранных слайдов ({len(rows)} шт.):",
+            rows[0] + 1, 1, self.model.rowCount() - len(rows) + 1
+        )
+        if ok:
+            self.model.move_rows(rows, position - 1)
+            self.list_images.scrollTo(self.list_images.currentIndex())
 
     def update_code_display(self, current, previous):
-        if previous is not None:
-            prev_widget = self.list_images.itemWidget(previous)
-            if prev_widget:
-                prev_widget.setStyleSheet("")
-
-        if current is not None:
-            current_widget = self.list_images.itemWidget(current)
-            if current_widget:
-                current_widget.setStyleSheet("background-color: #0a0a2a; border: 2px solid #ff3355; border-radius: 3px;")
-
-            current_row = self.list_images.row(current)
-            if current_row >= 0 and self.images:
-                current_image = self.images[current_row]
-                self.code_input.setText(self.codes.get(current_image, ""))
+        if current is not None and current.isValid():
+            self.code_input.setText(self.model.code(current.row()))
 
     def save_code(self):
-        current_row = self.list_images.currentRow()
-        if current_row >= 0 and self.images:
-            current_image = self.images[current_row]
-            new_code = self.code_input.text()
-            self.codes[current_image] = new_code
-
-            item = self.list_images.item(current_row)
-            widget = self.list_images.itemWidget(item)
-            code_label = widget.layout().itemAt(2).widget()
-            code_label.setText(f"🔓 Код: {new_code}")
+        current_row = self.current_row()
+        if current_row >= 0 and self.model.rowCount():
+            self.model.set_code(current_row, self.code_input.text())
+            self.code_saved.emit(self.model.images[current_row], self.code_input.text())
 
             NotificationManager.show_message(
                 self,
@@ -613,17 +2409,599 @@ class ImageCodeEditor(QWidget):
 
     def get_config(self):
         return {
-            "images": self.images,
-            "codes": self.codes
+            "images": list(self.model.images),
+            "codes": dict(self.model.codes)
         }
 
     def set_config(self, config):
-        self.images = config.get("images", [])
-        self.codes = config.get("codes", {})
+        # Незаконченная порционная загрузка заменяется новой колодой и должна завершиться так же
+        abandoned = bool(self.pending_images) or self.load_timer.isActive()
+        self.load_timer.stop()
+        self.pending_images = []
+        self.btn_add.setEnabled(self.import_job is None and self.check_job is None)
+        # Совпадающие строки остаются на месте вместе с выделением
+        self.model.reconcile(config.get("images", []), config.get("codes", {}))
+        if not self.list_images.currentIndex().isValid():
+            if self.model.rowCount():
+                self.select_row(0)
+        else:
+            self.update_code_display(self.list_images.currentIndex(), None)
+        if abandoned:
+            self.loaded.emit()
+
+    def set_config_progressively(self, config):
+        # Строки добавляются порциями между итерациями цикла событий, окно не замирает
+        self.model.set_deck([], config.get("codes", {}))
+        self.pending_images = list(config.get("images", []))
+        self.btn_add.setEnabled(False)
+        self.load_next_chunk()
+
+    def load_next_chunk(self):
+        chunk = self.pending_images[:self.LOAD_CHUNK]
+        del self.pending_images[:self.LOAD_CHUNK]
+
+        first_chunk = self.model.rowCount() == 0
+        self.model.append_images(chunk, {})
+        if first_chunk and chunk:
+            self.select_row(0)
+
+        if self.pending_images:
+            self.load_timer.start(0)
+        else:
+            self.btn_add.setEnabled(self.import_job is None and self.check_job is None)
+            self.loaded.emit()
+
 
-        self.list_images.clear()
-        for image in self.images:
-            self.add_image_to_list(image)
+class DecodeSignals(QObject):
+    finished = pyqtSignal(str, QImage)
+    probed = pyqtSignal(str, bool)
+
+
+class DecodeTask(QRunnable):
+    def __init__(self, path, target_size=None, bounded=True, decode=True):
+        super().__init__()
+        self.path = path
+        self.target_size = target_size
+        self.bounded = bounded
+        self.decode = decode
+        self.signals = DecodeSignals()
+
+    def run(self):
+        # QImage (в отличие от QPixmap) можно создавать вне GUI-потока
+        if self.decode:
+            self.signals.finished.emit(self.path, read_slide_image(self.path, self.target_size, self.bounded))
+        # Анимирован ли слайд, узнаем здесь же, чтобы GUI-поток не открывал файл ради заголовка
+        self.signals.probed.emit(self.path, slide_animated(self.path))
+
+
+class SlidePrefetcher(QObject):
+    animation_probed = pyqtSignal(str)
+
+    def __init__(self, ahead=3, behind=1, workers=2, parent=None):
+        super().__init__(parent)
+        self.ahead = ahead
+        self.behind = behind
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+
+        self.images = []
+        self.wanted = set()
+        self.frames = {}
+        self.pending = {}
+        self.target_size = None
+        self.bounded = DEFAULT_SETTINGS["bounded_decode"]
+        # Признак анимации по пути переживает смену колоды и экрана, сбрасывается только при изменении файла
+        self.animated = {}
+        self.probing = set()
+
+    def configure(self, ahead, behind, workers, bounded=True):
+        self.ahead = max(0, ahead)
+        self.behind = max(0, behind)
+        self.pool.setMaxThreadCount(max(1, workers))
+        # Обычные файлы теперь декодируются в другом размере
+        if bounded != self.bounded:
+            self.clear()
+            self.bounded = bounded
+
+    def set_images(self, images):
+        self.clear()
+        self.images = list(images)
+
+    def set_target_size(self, size):
+        # Кадры, подобранные под другой экран, больше не годятся
+        if size != self.target_size:
+            self.clear()
+            self.target_size = size
+
+    def clear(self):
+        # Уже запущенные задачи доработают, но их результат будет отброшен
+        self.pool.clear()
+        self.pending.clear()
+        self.frames.clear()
+        self.probing.clear()
+        self.wanted = set()
+
+    def update(self, index):
+        # Порядок важен: сначала ближайшие следующие слайды, потом предыдущие
+        order = [index]
+        order += range(index + 1, min(index + self.ahead + 1, len(self.images)))
+        order += range(index - 1, max(index - self.behind, 0) - 1, -1)
+        paths = [self.images[i] for i in order if 0 <= i < len(self.images)]
+
+        self.wanted = set(paths)
+        for path in list(self.frames):
+            if path not in self.wanted:
+                del self.frames[path]
+
+        for priority, path in enumerate(paths):
+            if path in self.pending:
+                continue
+            decode = path not in self.frames
+            if not decode and (path in self.animated or path in self.probing):
+                continue
+            # Кадр уже есть (декодирован синхронно), но анимированность еще не проверена
+            task = DecodeTask(path, self.target_size, self.bounded, decode)
+            task.signals.finished.connect(self.on_decoded)
+            task.signals.probed.connect(self.on_probed)
+            if decode:
+                self.pending[path] = task
+            self.probing.add(path)
+            self.pool.start(task, -priority)
+
+    def discard(self, paths):
+        for path in paths:
+            self.frames.pop(path, None)
+            self.pending.pop(path, None)
+            self.animated.pop(path, None)
+            self.probing.discard(path)
+
+    def store(self, path, image):
+        # Слайд уже декодирован синхронно: update() не должен ставить его в очередь еще раз
+        self.pending.pop(path, None)
+        self.frames[path] = image
+
+    def take(self, path):
+        with TransitionTracer.span("prefetch_take", path=path) as args:
+            frame = self.frames.get(path)
+            if args is not None:
+                args["hit"] = frame is not None
+            return frame
+
+    def on_decoded(self, path, image):
+        if self.pending.pop(path, None) is None:
+            return
+        if path in self.wanted:
+            self.frames[path] = image
+
+    def on_probed(self, path, animated):
+        self.probing.discard(path)
+        self.animated[path] = animated
+        self.animation_probed.emit(path)
+
+
+class ScaledPixmapCache:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(path, size, dpr):
+        return (path, slide_mtime(path), size.width(), size.height(), dpr)
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.evict()
+
+    def get(self, key):
+        pixmap = self.entries.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        size = self.pixmap_bytes(pixmap)
+        if size > self.budget_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= self.pixmap_bytes(old)
+        self.entries[key] = pixmap
+        self.total_bytes += size
+        self.evict()
+
+    def evict(self):
+        # Вытесняем давно не использованные записи, пока не уложимся в бюджет
+        while self.total_bytes > self.budget_bytes and self.entries:
+            _, pixmap = self.entries.popitem(last=False)
+            self.total_bytes -= self.pixmap_bytes(pixmap)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def discard(self, paths):
+        paths = set(paths)
+        for key in [key for key in self.entries if key[0] in paths]:
+            self.total_bytes -= self.pixmap_bytes(self.entries.pop(key))
+
+    def covering(self, path, size):
+        # Самая крупная копия слайда, из которой можно получить size только уменьшением
+        mtime = slide_mtime(path)
+        best = None
+        for key, pixmap in self.entries.items():
+            if key[0] == path and key[1] == mtime and (best is None or pixmap.width() > best.width()):
+                best = pixmap
+        if best is None:
+            return None
+        fitted = best.size().scaled(size, Qt.KeepAspectRatio)
+        if fitted.width() > best.width() or fitted.height() > best.height():
+            return None
+        return best
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class WarmSignals(QObject):
+    finished = pyqtSignal(str, list)
+
+
+class WarmTask(QRunnable):
+    def __init__(self, path, decode_size, bounded, sizes, dpr):
+        super().__init__()
+        self.path = path
+        self.decode_size = decode_size
+        self.bounded = bounded
+        self.sizes = sizes
+        self.dpr = dpr
+        self.signals = WarmSignals()
+
+    def run(self):
+        # Масштабирование тоже здесь: в GUI-потоке остается только QPixmap.fromImage
+        image = read_slide_image(self.path, self.decode_size, self.bounded)
+        scaled = []
+        if not image.isNull():
+            for size in self.sizes:
+                scaled.append((size, image.scaled(size * self.dpr, Qt.KeepAspectRatio, Qt.SmoothTransformation)))
+        self.signals.finished.emit(self.path, scaled)
+
+
+class SlideCanvas(QWidget):
+    # Рисует слайд сам, без QLabel: нет пересчета sizeHint и перекладки layout при каждой смене
+    painted = pyqtSignal()
+    resized = pyqtSignal()
+
+    BACKGROUND = QColor(10, 10, 10)
+    TRANSITIONS = ("none", "crossfade", "slide")
+    FRAME_INTERVAL_MS = 16
+    # Кадр дольше полутора интервалов 60 fps считаем пропущенным
+    SLOW_FRAME_MS = 25
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.pixmap = None
+        self.pixmap_pos = QPoint()
+        # Размер холста, под который отмасштабирован pixmap
+        self.fitted_size = None
+
+        # Переход между слайдами: оба кадра уже готового размера, в цикле только отрисовка
+        self.transition = "crossfade"
+        self.transition_ms = 250
+        self.previous = None
+        self.previous_pos = QPoint()
+        self.direction = 1
+        self.transition_started = 0.0
+        self.last_frame = 0.0
+        self.frame_count = 0
+        self.frame_max_ms = 0.0
+        self.slow_frames = 0
+        self.transition_stats = deque(maxlen=100)
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.PreciseTimer)
+        self.frame_timer.setInterval(self.FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self.update)
+
+    def sizeHint(self):
+        return QSize(640, 480)
+
+    def minimumSizeHint(self):
+        return QSize(1, 1)
+
+    def configure(self, transition, transition_ms):
+        self.finish_transition()
+        self.transition = transition if transition in self.TRANSITIONS else "none"
+        self.transition_ms = max(0, transition_ms)
+
+    def target_size(self):
+        return self.size() * self.devicePixelRatioF()
+
+    def centered_pos(self, pixmap):
+        dpr = pixmap.devicePixelRatio()
+        rect = QRect(0, 0, round(pixmap.width() / dpr), round(pixmap.height() / dpr))
+        rect.moveCenter(self.rect().center())
+        return rect.topLeft()
+
+    def set_pixmap(self, pixmap, direction=0):
+        previous = self.pixmap if self.is_fitted() else None
+        self.finish_transition()
+        self.pixmap = pixmap
+        self.pixmap_pos = self.centered_pos(pixmap)
+        self.fitted_size = self.size()
+
+        if direction and previous is not None and self.transition != "none" and self.transition_ms > 0:
+            self.previous = previous
+            self.previous_pos = self.centered_pos(previous)
+            self.direction = direction
+            self.transition_started = self.last_frame = time.perf_counter()
+            self.frame_count = 0
+            self.frame_max_ms = 0.0
+            self.slow_frames = 0
+            self.frame_timer.start()
+        self.update()
+
+    def is_fitted(self):
+        return self.pixmap is not None and self.fitted_size == self.size()
+
+    def clear(self):
+        self.finish_transition()
+        self.pixmap = None
+        self.fitted_size = None
+        self.update()
+
+    def finish_transition(self):
+        if self.previous is None:
+            return
+        self.frame_timer.stop()
+        self.previous = None
+
+        duration_ms = (self.last_frame - self.transition_started) * 1000
+        stats = {
+            "kind": self.transition,
+            "frames": self.frame_count,
+            "avg_frame_ms": round(duration_ms / max(1, self.frame_count), 2),
+            "max_frame_ms": round(self.frame_max_ms, 2),
+            "slow_frames": self.slow_frames,
+        }
+        self.transition_stats.append(stats)
+        if TransitionTracer.enabled:
+            TransitionTracer.add(
+                "transition_animation",
+                (self.transition_started - TransitionTracer.started) * 1000000,
+                duration_ms * 1000,
+                stats
+            )
+
+    def stats(self):
+        frames = sum(item["frames"] for item in self.transition_stats)
+        slow = sum(item["slow_frames"] for item in self.transition_stats)
+        return {
+            "transitions": len(self.transition_stats),
+            "frames": frames,
+            "slow_frames": slow,
+            "max_frame_ms": max((item["max_frame_ms"] for item in self.transition_stats), default=0.0),
+        }
+
+    def resizeEvent(self, event):
+        # Кадры перехода готовились под старый размер
+        self.finish_transition()
+        super().resizeEvent(event)
+        self.resized.emit()
+
+    def paint_transition(self, painter):
+        now = time.perf_counter()
+        frame_ms = (now - self.last_frame) * 1000
+        self.last_frame = now
+        self.frame_count += 1
+        if frame_ms > self.frame_max_ms:
+            self.frame_max_ms = frame_ms
+        if frame_ms > self.SLOW_FRAME_MS:
+            self.slow_frames += 1
+
+        progress = min(1.0, (now - self.transition_started) * 1000 / self.transition_ms)
+        if self.transition == "slide":
+            offset = round(self.width() * progress) * self.direction
+            painter.drawPixmap(self.previous_pos.x() - offset, self.previous_pos.y(), self.previous)
+            painter.drawPixmap(
+                self.pixmap_pos.x() - offset + self.width() * self.direction, self.pixmap_pos.y(), self.pixmap
+            )
+        else:
+            painter.drawPixmap(self.previous_pos, self.previous)
+            painter.setOpacity(progress)
+            painter.drawPixmap(self.pixmap_pos, self.pixmap)
+        return progress >= 1.0
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.BACKGROUND)
+        finished = False
+        if self.previous is not None:
+            finished = self.paint_transition(painter)
+        elif self.pixmap is not None and not self.pixmap.isNull():
+            if self.is_fitted():
+                # Pixmap уже нужного размера - просто копируем его в центр
+                painter.drawPixmap(self.pixmap_pos, self.pixmap)
+            else:
+                # Пока окно меняет размер, растягиваем имеющийся pixmap без новых буферов
+                dpr = self.pixmap.devicePixelRatio()
+                logical = QSize(round(self.pixmap.width() / dpr), round(self.pixmap.height() / dpr))
+                rect = QRect(QPoint(0, 0), logical.scaled(self.size(), Qt.KeepAspectRatio))
+                rect.moveCenter(self.rect().center())
+                painter.drawPixmap(rect, self.pixmap)
+        painter.end()
+        if finished:
+            self.finish_transition()
+        self.painted.emit()
+
+
+class AnimatedSlidePlayer(QObject):
+    # Кадры читаются по одному из QImageReader: в памяти только небольшое окно
+    # готовых кадров, а не вся анимация
+    FRAME_WINDOW = 3
+    DEFAULT_DELAY_MS = 100
+    MIN_DELAY_MS = 20
+
+    def __init__(self, canvas, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.advance)
+
+        self.path = None
+        self.reader = None
+        self.frames = deque()
+        self.due = None
+        self.paused = False
+        self.started_us = None
+
+        self.shown = 0
+        self.dropped = 0
+        self.total_shown = 0
+        self.total_dropped = 0
+        self.plays = 0
+
+    def is_active(self):
+        return self.path is not None
+
+    def play(self, path):
+        # Вызывается только для слайдов, про которые поток декодирования уже выяснил, что они анимированы
+        if path == self.path:
+            return True
+        self.stop()
+
+        self.path = path
+        self.plays += 1
+        self.started_us = TransitionTracer.now_us()
+        self.open_reader()
+        self.fill()
+        if not self.frames:
+            self.stop()
+            return False
+        self.due = None
+        if self.canvas.isVisible():
+            self.advance()
+        else:
+            self.paused = True
+        return True
+
+    def open_reader(self):
+        self.reader = open_slide_reader(self.path)
+        size = self.reader.size()
+        if size.isValid():
+            # Декодер сразу отдает кадр под размер холста
+            self.reader.setScaledSize(size.scaled(self.canvas.target_size(), Qt.KeepAspectRatio))
+
+    def read_frame(self):
+        image = self.reader.read()
+        if image.isNull():
+            # Анимация закончилась - начинаем сначала новым читателем
+            self.open_reader()
+            image = self.reader.read()
+            if image.isNull():
+                return None
+        delay = self.reader.nextImageDelay()
+        if delay < self.MIN_DELAY_MS:
+            delay = self.DEFAULT_DELAY_MS
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(self.canvas.devicePixelRatioF())
+        return pixmap, delay
+
+    def fill(self):
+        while len(self.frames) < self.FRAME_WINDOW:
+            frame = self.read_frame()
+            if frame is None:
+                break
+            self.frames.append(frame)
+
+    def advance(self):
+        if self.path is None or self.paused:
+            return
+        now = time.perf_counter()
+        lateness = 0.0 if self.due is None else max(0.0, now - self.due)
+
+        # Если опоздали больше чем на длительность кадра, он уже не нужен
+        while len(self.frames) > 1 and lateness * 1000 >= self.frames[0][1]:
+            lateness -= self.frames.popleft()[1] / 1000
+            self.dropped += 1
+            self.fill()
+        if not self.frames:
+            return
+
+        pixmap, delay = self.frames.popleft()
+        self.canvas.set_pixmap(pixmap)
+        self.shown += 1
+        self.due = now - lateness + delay / 1000
+        self.timer.start(max(0, round((self.due - now) * 1000)))
+        self.fill()
+
+    def pause(self):
+        if self.path is not None and not self.paused:
+            self.paused = True
+            self.timer.stop()
+
+    def resume(self):
+        if self.path is not None and self.paused:
+            self.paused = False
+            self.due = None
+            self.advance()
+
+    def rescale(self):
+        # Кадры старого размера выбрасываем, новые читаем уже под холст
+        if self.path is None:
+            return
+        self.frames.clear()
+        self.open_reader()
+        self.fill()
+        if not self.paused:
+            self.timer.stop()
+            self.due = None
+            self.advance()
+
+    def stop(self):
+        if self.path is not None and TransitionTracer.enabled:
+            TransitionTracer.add(
+                "animation", self.started_us, TransitionTracer.now_us() - self.started_us,
+                {"path": self.path, "shown": self.shown, "dropped": self.dropped}
+            )
+        self.timer.stop()
+        self.total_shown += self.shown
+        self.total_dropped += self.dropped
+        self.shown = 0
+        self.dropped = 0
+        self.path = None
+        self.reader = None
+        self.frames.clear()
+        self.due = None
+        self.paused = False
+
+    def stats(self):
+        return {
+            "plays": self.plays,
+            "shown": self.total_shown + self.shown,
+            "dropped": self.total_dropped + self.dropped,
+        }
 
 
 class SlideShowViewer(QWidget):
@@ -633,6 +3011,39 @@ class SlideShowViewer(QWidget):
         self.initUI()
         self.current_index = 0
         self.slideshow_active = False
+        self.success_dialog = None
+        self.prefetcher = SlidePrefetcher(
+            DEFAULT_SETTINGS["prefetch_ahead"],
+            DEFAULT_SETTINGS["prefetch_behind"],
+            DEFAULT_SETTINGS["decode_workers"],
+            self
+        )
+        self.prefetcher.animation_probed.connect(self.on_animation_probed)
+        self.display_cache = ScaledPixmapCache(DEFAULT_SETTINGS["display_cache_mb"] * 1024 * 1024)
+
+        # Исходник текущего слайда в памяти, чтобы масштабировать без повторного чтения с диска
+        self.current_path = None
+        self.current_source = None
+
+        # Момент смены слайда: первая отрисовка после него закрывает span в трассировке
+        self.transition_started_us = None
+
+        # Плавное масштабирование запускается один раз, когда изменение размера затихло
+        self.rescale_timer = QTimer(self)
+        self.rescale_timer.setSingleShot(True)
+        self.rescale_timer.setInterval(DEFAULT_SETTINGS["rescale_delay_ms"])
+        self.rescale_timer.timeout.connect(self.finish_rescale)
+
+    def apply_settings(self, settings):
+        self.prefetcher.configure(
+            settings["prefetch_ahead"],
+            settings["prefetch_behind"],
+            settings["decode_workers"],
+            settings["bounded_decode"]
+        )
+        self.display_cache.set_budget(settings["display_cache_mb"] * 1024 * 1024)
+        self.rescale_timer.setInterval(settings["rescale_delay_ms"])
+        self.canvas.configure(settings["transition"], settings["transition_ms"])
 
     def initUI(self):
         self.layout = QVBoxLayout()
@@ -640,11 +3051,11 @@ class SlideShowViewer(QWidget):
         self.layout.setSpacing(0)
 
         # Изображение
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.image_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.image_label.setStyleSheet("background-color: #0a0a0a;")
-        self.layout.addWidget(self.image_label, stretch=10)
+        self.canvas = SlideCanvas()
+        self.canvas.painted.connect(self.on_canvas_painted)
+        self.canvas.resized.connect(self.schedule_rescale)
+        self.player = AnimatedSlidePlayer(self.canvas, self)
+        self.layout.addWidget(self.canvas, stretch=10)
 
         # Нижняя панель с элементами управления
         bottom_panel = QWidget()
@@ -751,6 +3162,10 @@ class SlideShowViewer(QWidget):
         self.layout.addWidget(bottom_panel)
         self.setLayout(self.layout)
 
+        # Немодальные уведомления поверх слайда
+        self.toast = ToastOverlay(self)
+        self.preflight_overlay = PreflightOverlay(self)
+
         self.btn_prev.clicked.connect(self.prev_image)
         self.btn_next.clicked.connect(self.next_image)
         self.btn_close.clicked.connect(self.close_slideshow)
@@ -770,31 +3185,156 @@ class SlideShowViewer(QWidget):
         self.codes = codes
         self.current_index = 0
         self.slideshow_active = True
+        self.prefetcher.set_images(images)
         self.show_image()
 
-    def show_image(self):
+    def show_image(self, direction=0):
         if not self.slideshow_active:
             return
 
         if self.images and self.current_index < len(self.images):
-            pixmap = QPixmap(self.images[self.current_index])
-            if not pixmap.isNull():
-                self.image_label.setPixmap(
-                    pixmap.scaled(
-                        self.image_label.size(),
+            path = self.images[self.current_index]
+            if TransitionTracer.enabled:
+                self.transition_started_us = TransitionTracer.now_us()
+
+            with TransitionTracer.span("show_image", index=self.current_index, path=path):
+                target_size = self.target_size()
+                if path != self.current_path or target_size != self.prefetcher.target_size:
+                    self.prefetcher.set_target_size(target_size)
+                    self.current_path = path
+                    self.current_source = self.prefetcher.take(path)
+                    self.rescale_timer.stop()
+
+                if self.prefetcher.animated.get(path):
+                    animated = self.player.play(path)
+                else:
+                    # Пока признак неизвестен, показываем первый кадр; анимация начнется по animation_probed
+                    self.player.stop()
+                    animated = False
+                pixmap = None if animated else self.scaled_pixmap(path)
+                self.prefetcher.update(self.current_index)
+
+                if animated or pixmap is not None:
+                    if pixmap is not None:
+                        with TransitionTracer.span("set_pixmap"):
+                            self.canvas.set_pixmap(pixmap, direction)
+                    self.code_input.clear()
+                    self.code_input.setFocus()
+                else:
+                    self.transition_started_us = None
+                    self.toast.show_message(f"😨 Не удалось загрузить изображение: {slide_name(path)}")
+
+    def on_animation_probed(self, path):
+        # Текущий слайд оказался анимированным уже после показа первого кадра
+        if self.slideshow_active and path == self.current_path and self.prefetcher.animated.get(path):
+            self.player.play(path)
+
+    def on_canvas_painted(self):
+        if self.transition_started_us is not None:
+            started = self.transition_started_us
+            self.transition_started_us = None
+            TransitionTracer.add(
+                "first_paint", started, TransitionTracer.now_us() - started,
+                {"index": self.current_index}
+            )
+
+    def resizeEvent(self, event):
+        self.toast.reposition()
+        self.preflight_overlay.setGeometry(self.rect())
+        super().resizeEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.player.resume()
+
+    def hideEvent(self, event):
+        # Скрытая анимация не должна декодировать кадры впустую
+        self.player.pause()
+        super().hideEvent(event)
+
+    def invalidate_paths(self, paths):
+        # Файл изменился на диске: забываем его кадры и, если он на экране, показываем заново
+        self.prefetcher.discard(paths)
+        self.display_cache.discard(paths)
+        if self.slideshow_active and self.current_path in paths:
+            self.player.stop()
+            self.current_path = None
+            self.current_source = None
+            self.show_image()
+
+    def target_size(self):
+        # Копия слайда должна покрывать весь экран: окно на нем может развернуться в любой момент
+        screen = self.screen()
+        return screen.size() * screen.devicePixelRatio()
+
+    def fullscreen_canvas_size(self):
+        # Нижняя панель фиксированной высоты, поэтому весь прирост окна достается холсту
+        return self.canvas.size() + (self.screen().size() - self.window().size())
+
+    def warm_slide(self, path, size, image):
+        dpr = self.canvas.devicePixelRatioF()
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(dpr)
+        self.display_cache.put(ScaledPixmapCache.make_key(path, size, dpr), pixmap)
+
+    def source_image(self, path, load=True):
+        # Берем заранее декодированный кадр, если фоновая задача уже успела
+        if self.current_source is None:
+            self.current_source = self.prefetcher.take(path)
+        if self.current_source is None and load:
+            with TransitionTracer.span("load_sync", path=path):
+                self.current_source = read_slide_image(path, self.prefetcher.target_size, self.prefetcher.bounded)
+            if not self.current_source.isNull():
+                self.prefetcher.store(path, self.current_source)
+        return self.current_source
+
+    def scaled_pixmap(self, path):
+        dpr = self.canvas.devicePixelRatioF()
+        key = ScaledPixmapCache.make_key(path, self.canvas.size(), dpr)
+
+        pixmap = self.display_cache.get(key)
+        if pixmap is None and self.source_image(path, load=False) is None:
+            # Слайд показан из кэша и исходника в памяти нет: при смене размера уменьшаем
+            # готовую копию, а не читаем файл заново
+            cached = self.display_cache.covering(path, self.canvas.target_size())
+            if cached is not None:
+                with TransitionTracer.span("scale", source=f"cached {cached.width()}x{cached.height()}"):
+                    pixmap = cached.scaled(self.canvas.target_size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                    pixmap.setDevicePixelRatio(dpr)
+                self.display_cache.put(key, pixmap)
+        if pixmap is None:
+            image = self.source_image(path)
+            if not image.isNull():
+                with TransitionTracer.span("scale", source=f"{image.width()}x{image.height()}"):
+                    image = image.scaled(
+                        self.canvas.target_size(),
                         Qt.KeepAspectRatio,
                         Qt.SmoothTransformation
                     )
-                )
-                self.code_input.clear()
-                self.code_input.setFocus()
-            else:
-                NotificationManager.show_message(
-                    self,
-                    "Ошибка 😨",
-                    f"Не удалось загрузить изображение: {self.images[self.current_index]}",
-                    buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
-                )
+                    pixmap = QPixmap.fromImage(image)
+                    pixmap.setDevicePixelRatio(dpr)
+                self.display_cache.put(key, pixmap)
+        return pixmap
+
+    def schedule_rescale(self):
+        if not self.slideshow_active or self.current_path is None:
+            return
+
+        # Пока окно меняет размер, холст сам растягивает текущий pixmap при отрисовке
+        self.rescale_timer.start()
+
+    def finish_rescale(self):
+        if not self.slideshow_active or self.current_path is None:
+            return
+
+        if self.canvas.is_fitted():
+            return
+        if self.player.is_active():
+            self.player.rescale()
+            return
+        pixmap = self.scaled_pixmap(self.current_path)
+        if pixmap is not None:
+            self.canvas.set_pixmap(pixmap)
 
     def prev_image(self):
         if not self.slideshow_active:
@@ -802,62 +3342,56 @@ class SlideShowViewer(QWidget):
 
         if self.current_index > 0:
             self.current_index -= 1
-            self.show_image()
+            self.show_image(-1)
 
     def next_image(self):
+        # Ошибки ввода показываются тостом: модальное окно остановило бы цикл событий
         if not self.slideshow_active:
-            NotificationManager.show_message(
-                self,
-                "Ошибка 😕",
-                "Слайд-шоу не запущено!",
-                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
-            )
+            self.toast.show_message("😕 Слайд-шоу не запущено!")
             return
 
         if not self.images:
-            NotificationManager.show_message(
-                self,
-                "Ошибка 😕",
-                "Нет изображений для показа!",
-                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
-            )
+            self.toast.show_message("😕 Нет изображений для показа!")
             return
 
         if self.current_index >= len(self.images) - 1:
             current_image = self.images[self.current_index]
-            required_code = self.codes.get(current_image, "")
-
-            if self.code_input.text() == required_code:
-                success_dialog = SuccessDialog(self)
-                success_dialog.exec_()
+            with TransitionTracer.span("code_check", index=self.current_index):
+                accepted = self.code_input.text() == self.codes.get(current_image, "")
+
+            if accepted:
+                self.toast.dismiss()
+                with TransitionTracer.span("success_dialog"):
+                    if self.success_dialog is None:
+                        self.success_dialog = SuccessDialog(self)
+                    self.success_dialog.exec_()
                 self.close_slideshow()
                 self.parent_window.tabs.setCurrentIndex(0)
             else:
-                NotificationManager.show_message(
-                    self,
-                    "Ошибка ❌",
-                    "Неверный код!",
-                    buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
-                )
+                self.toast.show_message("❌ Неверный код!")
             return
 
         current_image = self.images[self.current_index]
-        required_code = self.codes.get(current_image, "")
+        with TransitionTracer.span("code_check", index=self.current_index):
+            accepted = self.code_input.text() == self.codes.get(current_image, "")
 
-        if self.code_input.text() == required_code:
+        if accepted:
             self.current_index += 1
-            self.show_image()
+            self.toast.dismiss()
+            self.show_image(1)
         else:
-            NotificationManager.show_message(
-                self,
-                "Ошибка ❌",
-                "Неверный код!",
-                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
-            )
+            self.toast.show_message("❌ Неверный код!")
 
     def close_slideshow(self):
         self.slideshow_active = False
-        self.image_label.clear()
+        self.transition_started_us = None
+        self.player.stop()
+        self.toast.dismiss()
+        self.prefetcher.clear()
+        self.rescale_timer.stop()
+        self.current_path = None
+        self.current_source = None
+        self.canvas.clear()
         self.code_input.clear()
         self.parent_window.tabs.setTabEnabled(0, True)
         self.parent_window.tabs.setCurrentIndex(0)
@@ -865,6 +3399,9 @@ class SlideShowViewer(QWidget):
 
         self.parent_window.btn_start.show()
         self.parent_window.btn_save.show()
+        self.parent_window.btn_export.show()
+        self.parent_window.btn_open_package.show()
+        self.parent_window.export_trace()
 
         QTimer.singleShot(50, lambda: [
             self.parent_window.resize(1000, 700),
@@ -873,11 +3410,91 @@ class SlideShowViewer(QWidget):
         self.parent_window.tabs.setTabEnabled(1, False)
 
 
+class SlideshowPreflight(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(list, bool)
+
+    def __init__(self, images, thumbnails, viewer, settings, parent=None):
+        super().__init__(parent)
+        self.images = list(images)
+        self.viewer = viewer
+        self.warm_count = min(len(self.images), max(0, settings["preflight_slides"]))
+        self.warmed = 0
+        self.checked = False
+        self.active = False
+        self.tasks = []
+
+        # Проверка декодируемости та же, что при импорте: из файла строится миниатюра
+        self.check = ImportJob(self.images, thumbnails, settings["import_workers"], self)
+        self.check.progress.connect(self.on_check_progress)
+        self.check.finished.connect(self.on_check_finished)
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, settings["decode_workers"]))
+
+    def total(self):
+        return len(self.images) + self.warm_count
+
+    def start(self):
+        self.active = True
+        # Первый слайд показывается еще до того, как окно успеет развернуться, поэтому
+        # для него готовим и текущий размер холста
+        fullscreen = self.viewer.fullscreen_canvas_size()
+        current = self.viewer.canvas.size()
+        decode_size = self.viewer.target_size()
+        dpr = self.viewer.canvas.devicePixelRatioF()
+        for i, path in enumerate(self.images[:self.warm_count]):
+            sizes = [fullscreen, current] if i == 0 and current != fullscreen else [fullscreen]
+            task = WarmTask(path, decode_size, self.viewer.prefetcher.bounded, sizes, dpr)
+            task.signals.finished.connect(self.on_warmed)
+            self.tasks.append(task)
+            self.pool.start(task, -i)
+        self.check.start()
+
+    def cancel(self):
+        if not self.active:
+            return
+        self.pool.clear()
+        self.finish(True)
+
+    def on_check_progress(self, done, total, rate):
+        self.progress.emit(done + self.warmed, self.total())
+
+    def on_check_finished(self, added, skipped, cancelled):
+        if not self.active:
+            return
+        self.checked = True
+        if self.warmed >= self.warm_count:
+            self.finish(False)
+
+    def on_warmed(self, path, scaled):
+        if not self.active:
+            return
+        for size, image in scaled:
+            self.viewer.warm_slide(path, size, image)
+        self.warmed += 1
+        self.progress.emit(self.check.done + self.warmed, self.total())
+        if self.checked and self.warmed >= self.warm_count:
+            self.finish(False)
+
+    def finish(self, cancelled):
+        self.active = False
+        self.tasks = []
+        self.check.cancel()
+        broken = [i for i, valid in enumerate(self.check.valid) if valid is False]
+        self.finished.emit(broken, cancelled)
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.storage = None
+        self.profiler = profiler or StartupProfiler()
+        self.first_paint_done = False
+        self.preflight = None
         self.initUI()
-        self.load_config()
+        self.profiler.mark("window_created")
 
     def initUI(self):
         self.setWindowTitle("🎮 Игровое слайд-шоу с кодами 🎮")
@@ -947,12 +3564,12 @@ class MainWindow(QMainWindow):
         # Редактор
         self.editor = ImageCodeEditor()
 
-        # Просмотрщик
-        self.viewer = SlideShowViewer(self)
+        # Просмотрщик создается при первом запуске слайд-шоу, пока на его месте заглушка
+        self.viewer = None
 
         # Добавляем вкладки
         self.tabs.addTab(self.editor, "📝 Редактор")
-        self.tabs.addTab(self.viewer, "🖼️ Просмотр")
+        self.tabs.addTab(QWidget(), "🖼️ Просмотр")
 
         # Блокируем вкладку просмотра до запуска слайд-шоу
         self.tabs.setTabEnabled(1, False)
@@ -996,6 +3613,11 @@ class MainWindow(QMainWindow):
             }
         """)
 
+        self.btn_export = QPushButton("📦 Экспорт пакета")
+        self.btn_open_package = QPushButton("📂 Открыть пакет")
+        for btn in (self.btn_export, self.btn_open_package):
+            btn.setStyleSheet(self.btn_save.styleSheet())
+
         # Горизонтальная линия разделения
         line = QFrame()
         line.setFrameShape(QFrame.HLine)
@@ -1011,6 +3633,8 @@ class MainWindow(QMainWindow):
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.btn_start)
         btn_layout.addWidget(self.btn_save)
+        btn_layout.addWidget(self.btn_export)
+        btn_layout.addWidget(self.btn_open_package)
         main_layout.addLayout(btn_layout)
 
         main_layout.setContentsMargins(15, 15, 15, 15)
@@ -1024,7 +3648,29 @@ class MainWindow(QMainWindow):
         # Соединение сигналов
         self.btn_start.clicked.connect(self.start_slideshow)
         self.btn_save.clicked.connect(self.save_config)
+        self.btn_export.clicked.connect(self.export_package)
+        self.btn_open_package.clicked.connect(self.open_package)
         self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.editor.loaded.connect(self.on_editor_loaded)
+        self.editor.code_saved.connect(self.save_code)
+
+        # До загрузки конфигурации запускать и сохранять нечего
+        self.btn_start.setEnabled(False)
+        self.btn_save.setEnabled(False)
+
+    def ensure_viewer(self):
+        if self.viewer is None:
+            self.viewer = SlideShowViewer(self)
+            self.viewer.apply_settings(self.settings)
+            self.editor.files_changed.connect(self.viewer.invalidate_paths)
+            placeholder = self.tabs.widget(1)
+            self.tabs.blockSignals(True)
+            self.tabs.removeTab(1)
+            self.tabs.insertTab(1, self.viewer, "🖼️ Просмотр")
+            self.tabs.setTabEnabled(1, False)
+            self.tabs.blockSignals(False)
+            placeholder.deleteLater()
+        return self.viewer
 
     def start_slideshow(self):
         config = self.editor.get_config()
@@ -1040,15 +3686,66 @@ class MainWindow(QMainWindow):
         # Скрываем кнопки перед запуском
         self.btn_start.hide()
         self.btn_save.hide()
+        self.btn_export.hide()
+        self.btn_open_package.hide()
 
+        self.ensure_viewer()
+        if self.settings["preflight"]:
+            self.start_preflight(config)
+            return
+        self.enter_slideshow(config)
+
+    def enter_slideshow(self, config):
         self.viewer.start_slideshow(config["images"], config["codes"])
         self.tabs.setTabEnabled(1, True)
         self.tabs.setCurrentIndex(1)
         self.tabs.setTabEnabled(0, False)
         self.showFullScreen()
 
+    def start_preflight(self, config):
+        # Вкладка просмотра открывается заранее: по ее раскладке считаем размер холста на весь экран
+        self.preflight = SlideshowPreflight(config["images"], self.editor.thumbnails, self.viewer, self.settings, self)
+        self.tabs.setTabEnabled(1, True)
+        self.tabs.setCurrentIndex(1)
+        self.tabs.setTabEnabled(0, False)
+        # Кнопки только что скрыты: раскладка должна пересчитаться до замера холста
+        self.centralWidget().layout().activate()
+
+        overlay = self.viewer.preflight_overlay
+        overlay.start(self.preflight.total())
+        overlay.btn_cancel.clicked.connect(self.preflight.cancel)
+        self.preflight.progress.connect(overlay.set_progress)
+        self.preflight.finished.connect(lambda broken, cancelled: self.on_preflight_finished(config, broken, cancelled))
+        self.preflight.start()
+
+    def on_preflight_finished(self, config, broken, cancelled):
+        overlay = self.viewer.preflight_overlay
+        overlay.btn_cancel.clicked.disconnect(self.preflight.cancel)
+        overlay.hide()
+        self.preflight.deleteLater()
+        self.preflight = None
+
+        if not cancelled and not broken:
+            self.enter_slideshow(config)
+            return
+
+        self.viewer.close_slideshow()
+        if broken:
+            names = "\n".join(f"{i + 1}. {slide_name(config['images'][i])}" for i in broken[:5])
+            if len(broken) > 5:
+                names += f"\n... и еще {len(broken) - 5}"
+            self.editor.select_row(broken[0])
+            NotificationManager.show_message(
+                self.editor,
+                "Ошибка 😕",
+                f"Не удалось загрузить слайды:\n{names}",
+                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
+            )
+
     def on_tab_changed(self, index):
-        if index == 1 and not self.viewer.slideshow_active:
+        if self.preflight is not None:
+            return
+        if index == 1 and (self.viewer is None or not self.viewer.slideshow_active):
             NotificationManager.show_message(
                 self.editor,
                 "Ошибка 😕",
@@ -1057,11 +3754,27 @@ class MainWindow(QMainWindow):
             )
             self.tabs.setCurrentIndex(0)
 
+    def save_code(self, path, code):
+        # Код уже сохраненного слайда пишется в колоду сразу, одной строкой. Новые слайды
+        # попадут в колоду вместе со своими кодами при сохранении конфигурации
+        if self.storage is None or path not in self.storage.path_ids:
+            return
+        try:
+            self.storage.set_code(path, code)
+        except sqlite3.Error as e:
+            NotificationManager.show_message(
+                self.editor,
+                "Ошибка 😨",
+                f"Не удалось сохранить код: {str(e)}",
+                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
+            )
+
     def save_config(self):
         config = self.editor.get_config()
         try:
-            with open("config.json", "w") as f:
-                json.dump(config, f)
+            if self.storage is None:
+                self.storage = DeckStorage(DECK_FILE)
+            self.storage.save_deck(config["images"], config["codes"], self.settings)
             NotificationManager.show_message(
                 self.editor,
                 "Сохранено ✅",
@@ -1076,12 +3789,92 @@ class MainWindow(QMainWindow):
                 buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
             )
 
+    def export_package(self):
+        config = self.editor.get_config()
+        if not config["images"]:
+            NotificationManager.show_message(
+                self.editor,
+                "Ошибка 😕",
+                "Добавьте хотя бы одно изображение!",
+                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
+            )
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт пакета колоды", "deck" + PACKAGE_EXTENSION,
+            f"Пакет колоды (*{PACKAGE_EXTENSION})"
+        )
+        if not path:
+            return
+        if not path.endswith(PACKAGE_EXTENSION):
+            path += PACKAGE_EXTENSION
+
+        progress_dialog = QProgressDialog("📦 Упаковка слайдов...", "Отмена", 0, len(config["images"]), self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(300)
+
+        def progress(done):
+            progress_dialog.setValue(done)
+            QApplication.processEvents()
+            return not progress_dialog.wasCanceled()
+
+        try:
+            DeckPackage.write(
+                path, config["images"], config["codes"],
+                self.settings["rendition_heights"], self.settings["render_workers"], progress
+            )
+        except InterruptedError:
+            return
+        except Exception as e:
+            NotificationManager.show_message(
+                self.editor,
+                "Ошибка 😨",
+                f"Не удалось создать пакет: {str(e)}",
+                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
+            )
+            return
+        finally:
+            progress_dialog.close()
+
+        NotificationManager.show_message(
+            self.editor,
+            "Готово 📦",
+            f"Пакет сохранен: {os.path.basename(path)}",
+            buttons=[("OK 👍", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #3366ff, stop:1 #2244cc);")]
+        )
+
+    def open_package(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Открыть пакет колоды", "",
+            f"Пакет колоды (*{PACKAGE_EXTENSION})"
+        )
+        if not path:
+            return
+
+        try:
+            self.editor.set_config(DeckPackage.open(path).deck())
+        except Exception as e:
+            NotificationManager.show_message(
+                self.editor,
+                "Ошибка 😨",
+                f"Не удалось открыть пакет: {str(e)}",
+                buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
+            )
+
     def load_config(self):
         try:
-            if os.path.exists("config.json"):
-                with open("config.json", "r") as f:
-                    config = json.load(f)
-                self.editor.set_config(config)
+            self.storage = DeckStorage(DECK_FILE)
+            # При первом запуске переносим колоду из старого config.json
+            if self.storage.needs_import() and os.path.exists(LEGACY_CONFIG_FILE):
+                self.storage.import_config(LEGACY_CONFIG_FILE)
+
+            config = self.storage.load_config()
+            self.settings = load_settings(config)
+            if self.viewer is not None:
+                self.viewer.apply_settings(self.settings)
+            self.editor.apply_settings(self.settings)
+            self.editor.set_config_progressively(config)
+            return
         except Exception as e:
             NotificationManager.show_message(
                 self.editor,
@@ -1089,16 +3882,169 @@ class MainWindow(QMainWindow):
                 f"Не удалось загрузить конфигурацию: {str(e)}",
                 buttons=[("OK 👌", "background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff3355, stop:1 #cc0022);")]
             )
+        self.on_editor_loaded()
 
-    def resizeEvent(self, event):
-        if self.tabs.currentIndex() == 1 and self.viewer.slideshow_active:
-            self.viewer.show_image()
-        super().resizeEvent(event)
+    def on_editor_loaded(self):
+        self.btn_start.setEnabled(True)
+        self.btn_save.setEnabled(True)
+        if "interactive" in self.profiler.marks:
+            return
+
+        self.profiler.mark("interactive")
+        if self.profiler.enabled:
+            report = self.profiler.report()
+            print(f"Запуск: {report}", file=sys.stderr)
+            self.statusBar().showMessage(f"⏱ {report}", 15000)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        # Конфигурация читается только после того, как окно уже нарисовано
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            self.profiler.mark("first_paint")
+            QTimer.singleShot(0, self.load_config)
+
+    def closeEvent(self, event):
+        if self.preflight is not None:
+            self.preflight.cancel()
+        self.editor.model.loader.shutdown()
+        self.editor.thumbnails.flush()
+        self.export_trace()
+        if self.storage is not None:
+            self.storage.close()
+        DeckPackage.close_all()
+        super().closeEvent(event)
+
+    def export_trace(self):
+        try:
+            TransitionTracer.export()
+        except OSError as e:
+            print(f"Не удалось сохранить трассировку: {e}", file=sys.stderr)
+
+
+def check_slide(path):
+    # Выполняется в отдельном процессе проверки колоды
+    result = {"path": path, "exists": slide_exists(path), "size_bytes": None,
+              "width": None, "height": None, "decode_ms": None, "error": None}
+    if not result["exists"]:
+        result["error"] = "файл не найден"
+        return result
+    try:
+        data = read_slide_bytes(path)
+    except (OSError, ValueError, IndexError) as e:
+        result["error"] = f"не удалось прочитать: {e}"
+        return result
+    result["size_bytes"] = len(data)
+
+    started = time.perf_counter()
+    image = QImage.fromData(data)
+    result["decode_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    if image.isNull():
+        result["error"] = "не удалось декодировать"
+    else:
+        result["width"] = image.width()
+        result["height"] = image.height()
+    return result
+
+
+def load_deck_source(source):
+    if source.endswith(PACKAGE_EXTENSION):
+        return DeckPackage.open(source).deck()
+    if source.endswith(".json"):
+        with open(source, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return {"images": config.get("images", []), "codes": config.get("codes", {})}
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"колода не найдена: {source}")
+    storage = DeckStorage(source, read_only=True)
+    try:
+        return storage.load_config()
+    finally:
+        storage.close()
+
+
+def validate_deck(config, workers):
+    images = config["images"]
+    codes = config["codes"]
+    with ProcessPoolExecutor(max(1, workers), multiprocessing.get_context("spawn")) as executor:
+        checks = list(executor.map(check_slide, images, chunksize=16))
+
+    slides = []
+    by_code = {}
+    for index, (path, check) in enumerate(zip(images, checks)):
+        code = codes.get(path, "")
+        slides.append(dict(check, index=index, code=code))
+        if code:
+            by_code.setdefault(code, []).append(index)
+
+    broken = [slide["index"] for slide in slides if slide["error"]]
+    empty_codes = [slide["index"] for slide in slides if not slide["code"]]
+    duplicate_codes = {code: indexes for code, indexes in by_code.items() if len(indexes) > 1}
+    return {
+        "slides": slides,
+        "broken": broken,
+        "empty_codes": empty_codes,
+        "duplicate_codes": duplicate_codes,
+        "summary": {
+            "slides": len(slides),
+            "broken": len(broken),
+            "empty_codes": len(empty_codes),
+            "duplicate_codes": len(duplicate_codes),
+            "total_bytes": sum(slide["size_bytes"] or 0 for slide in slides),
+            "max_decode_ms": max((slide["decode_ms"] or 0 for slide in slides), default=0),
+        },
+    }
+
+
+def validate_cli(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py --validate",
+        description="Проверка колоды без окна: файлы, декодирование и коды слайдов"
+    )
+    parser.add_argument("source", nargs="?", help="deck.db, config.json или пакет .ssdeck")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="число процессов проверки")
+    parser.add_argument("--strict", action="store_true", help="считать ошибкой пустые и повторяющиеся коды")
+    parser.add_argument("--output", help="записать отчет в файл вместо stdout")
+    args = parser.parse_args(argv)
+
+    source = args.source
+    if source is None:
+        source = DECK_FILE if os.path.exists(DECK_FILE) else LEGACY_CONFIG_FILE
+
+    try:
+        config = load_deck_source(source)
+    except Exception as e:
+        print(json.dumps({"source": source, "ok": False, "error": str(e)}, ensure_ascii=False))
+        return 2
+
+    report = validate_deck(config, args.workers)
+    failed = bool(report["broken"])
+    if args.strict:
+        failed = failed or bool(report["empty_codes"]) or bool(report["duplicate_codes"])
+    report = dict(source=source, ok=not failed, **report)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if failed else 0
 
 
 def main():
+    # Без этого собранный PyInstaller exe запускал бы в процессах упаковки само приложение
+    multiprocessing.freeze_support()
+    if "--validate" in sys.argv:
+        # Проверка колоды для сборки и выкладки: окно не создается
+        argv = [arg for arg in sys.argv[1:] if arg != "--validate"]
+        sys.exit(validate_cli(argv))
+
+    profiler = StartupProfiler("--startup-report" in sys.argv)
+    TransitionTracer.configure(sys.argv)
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
+    profiler.mark("app_created")
 
     # Устанавливаем темную тему для всех диалогов
     app.setStyleSheet("""
@@ -1115,7 +4061,7 @@ def main():
         }
     """)
 
-    window = MainWindow()
+    window = MainWindow(profiler)
     window.show()
     sys.exit(app.exec_())
 